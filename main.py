@@ -8,19 +8,143 @@ report generation.
 from __future__ import annotations
 
 import argparse
+import sys
 
+from src.dedupe import DEFAULT_DEDUPE_MEMORY_LIMIT, DedupeOptions
+from src.distributed import DEFAULT_RETRIES, DEFAULT_TIMEOUT, ReportWorker, parse_address
+from src.hll import DEFAULT_PRECISION
+from src.registry import REPORTS, load_report_names
 from src.report_factory import ReportFactory
+from src.store import ResultStore, parse_timestamp
+from src.utils import DEFAULT_DATA_ROOT, parse_size
 
 parser = argparse.ArgumentParser(description="Reports")
-parser.add_argument("--files", nargs="+", type=str, dest="file_names", required=True, help="files list")
-parser.add_argument("--report", type=str, dest="report_name", required=True, help="report name")
+parser.add_argument(
+    "--files", nargs="+", type=str, dest="file_names", default=None, help="files, directories or glob patterns"
+)
+parser.add_argument(
+    "--data-root", type=str, dest="data_root", default=DEFAULT_DATA_ROOT, help="directory files are resolved against"
+)
+parser.add_argument(
+    "--report",
+    nargs="+",
+    action="extend",
+    type=str,
+    dest="report_names",
+    default=None,
+    help=f"report names: {', '.join(REPORTS)}",
+)
+parser.add_argument("--config", type=str, dest="config", default=None, help="TOML file listing reports to run")
+parser.add_argument(
+    "--sample",
+    type=float,
+    dest="sample",
+    default=None,
+    help="fraction of the input to sample for an approximate report",
+)
+parser.add_argument(
+    "--sample-exact-fallback",
+    action="store_true",
+    dest="sample_exact_fallback",
+    help="compute groups the sample can't estimate exactly in one extra full pass",
+)
+parser.add_argument(
+    "--dedupe-on", type=str, dest="dedupe_on", default=None, help="comma-separated columns identifying duplicate rows"
+)
+parser.add_argument(
+    "--dedupe-memory",
+    type=parse_size,
+    dest="dedupe_memory",
+    default=DEFAULT_DEDUPE_MEMORY_LIMIT,
+    help="memory limit for de-duplication, e.g. 512M",
+)
+parser.add_argument(
+    "--dedupe-bloom", action="store_true", dest="dedupe_bloom", help="fall back to a Bloom filter at the memory limit"
+)
+parser.add_argument(
+    "--memory-limit",
+    type=parse_size,
+    dest="memory_limit",
+    default=None,
+    help="memory budget for group state before spilling to disk, e.g. 2G",
+)
+parser.add_argument(
+    "--serve", type=parse_address, dest="serve", default=None, help="run as a worker listening on host:port"
+)
+parser.add_argument(
+    "--workers", nargs="+", type=parse_address, dest="workers", default=None, help="worker host:port addresses"
+)
+parser.add_argument(
+    "--worker-timeout",
+    type=float,
+    dest="worker_timeout",
+    default=DEFAULT_TIMEOUT,
+    help="seconds a worker may stay silent before its task is retried",
+)
+parser.add_argument(
+    "--worker-retries", type=int, dest="worker_retries", default=DEFAULT_RETRIES, help="extra attempts per task"
+)
+parser.add_argument(
+    "--hll-precision",
+    type=int,
+    dest="hll_precision",
+    default=DEFAULT_PRECISION,
+    help="HyperLogLog precision for distinct counts (4-16, 2**p bytes per group)",
+)
+parser.add_argument("--store", type=str, dest="store", default=None, help="SQLite database to save results to")
+parser.add_argument(
+    "--history", type=str, dest="history", default=None, help="print the stored averages of a report over time"
+)
+parser.add_argument("--group", type=str, dest="group", default=None, help="only show this group in --history")
+parser.add_argument(
+    "--since", type=parse_timestamp, dest="since", default=None, help="only show runs since this ISO 8601 date or time"
+)
 args = parser.parse_args()
+if args.config is not None:
+    args.report_names = (args.report_names or []) + load_report_names(args.config)
+if args.history is not None and args.store is None:
+    parser.error("--history requires --store")
+if args.serve is None and args.history is None and (args.file_names is None or not args.report_names):
+    parser.error("the following arguments are required: --files, --report or --config")
 
 if __name__ == "__main__":
     if not vars(args):
         parser.print_usage()
-    if args.report_name == "average-rating":
-        report_columns = ("brand", "rating")
-        print(ReportFactory.get_report(tuple(args.file_names), report_columns))
-    else:
+    if args.serve is not None:
+        with ReportWorker(args.serve, args.data_root) as worker:
+            host, port = worker.server_address[:2]
+            print(f"Worker listening on {host}:{port}", flush=True)
+            worker.serve_forever()
+    if args.history is not None:
+        if args.history not in REPORTS:
+            print("No such report")
+        else:
+            with ResultStore(args.store) as store:
+                print(store.history_table(REPORTS[args.history].columns, args.group, args.history, args.since))
+        parser.exit()
+    dedupe = None
+    if args.dedupe_on:
+        dedupe = DedupeOptions(tuple(args.dedupe_on.split(",")), args.dedupe_memory, args.dedupe_bloom)
+    unknown = [name for name in args.report_names if name not in REPORTS]
+    if unknown:
         print("No such report")
+    else:
+        store = ResultStore(args.store) if args.store is not None else None
+        ReportFactory.write_reports(
+            sys.stdout,
+            tuple(args.file_names),
+            args.report_names,
+            data_root=args.data_root,
+            sample=args.sample,
+            dedupe=dedupe,
+            memory_limit=args.memory_limit,
+            workers=args.workers,
+            worker_timeout=args.worker_timeout,
+            worker_retries=args.worker_retries,
+            precision=args.hll_precision,
+            store=store,
+            sample_exact_fallback=args.sample_exact_fallback,
+        )
+        print()
+        if store is not None:
+            store.close()
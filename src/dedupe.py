@@ -0,0 +1,221 @@
+"""Row de-duplication for streaming scans.
+
+This module removes rows with a repeated key (e.g. ``name`` + ``brand``)
+while rows are streamed from the input files. Keys are reduced to 64-bit
+fingerprints kept in a compact open-addressing table, so the full keys
+are never stored. Two different keys share a fingerprint with a
+probability of about n²/2⁶⁵ for n distinct keys.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from array import array
+from collections.abc import Iterable, Iterator, Mapping
+from dataclasses import dataclass
+
+DEFAULT_DEDUPE_MEMORY_LIMIT = 256 * 1024 * 1024
+# Number of bit positions set per key in the Bloom filter
+BLOOM_HASHES = 7
+_KEY_SEPARATOR = "\x1f"
+
+
+def fingerprint(values: Iterable[str]) -> int:
+    """Compute a stable, non-zero 64-bit fingerprint of key values.
+
+    Args:
+        values: Key column values of a row
+
+    Returns:
+        Fingerprint as a positive integer
+    """
+    digest = hashlib.blake2b(_KEY_SEPARATOR.join(values).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little") or 1
+
+
+class FingerprintSet:
+    """Open-addressing hash set of 64-bit fingerprints in an ``array("Q")``.
+
+    Each slot takes 8 bytes and the table is kept at most half full, so a
+    key costs at most 32 bytes instead of ~70 for a Python ``set`` of ints.
+    Zero marks an empty slot. While the table grows, the old and the new
+    table are alive at the same time; both count towards ``max_bytes``.
+
+    Args:
+        max_bytes: Upper bound for the memory of the table, including growth
+
+    Raises:
+        MemoryError: From ``add`` when the table can't grow within ``max_bytes``
+    """
+
+    __slots__ = ("max_bytes", "_slots", "_mask", "_size")
+
+    def __init__(self, max_bytes: int, initial_capacity: int = 1024) -> None:
+        self.max_bytes: int = max_bytes
+        self._slots: array = array("Q", bytes(8 * initial_capacity))
+        self._mask: int = initial_capacity - 1
+        self._size: int = 0
+
+    def _find(self, key: int) -> int:
+        slots, mask = self._slots, self._mask
+        index = key & mask
+        while slots[index] != 0 and slots[index] != key:
+            index = (index + 1) & mask
+        return index
+
+    def _grow(self) -> None:
+        capacity = 2 * len(self._slots)
+        if 8 * capacity + self.nbytes > self.max_bytes:
+            raise MemoryError(f"Fingerprint table would exceed the memory limit of {self.max_bytes} bytes")
+        old_slots = self._slots
+        self._slots = array("Q", bytes(8 * capacity))
+        self._mask = capacity - 1
+        for key in old_slots:
+            if key:
+                self._slots[self._find(key)] = key
+
+    def add(self, key: int) -> bool:
+        """Insert a fingerprint.
+
+        Args:
+            key: Non-zero 64-bit fingerprint
+
+        Returns:
+            True if the fingerprint was not in the set yet
+        """
+        index = self._find(key)
+        if self._slots[index] == key:
+            return False
+        if 2 * (self._size + 1) > len(self._slots):
+            self._grow()
+            index = self._find(key)
+        self._slots[index] = key
+        self._size += 1
+        return True
+
+    def __contains__(self, key: int) -> bool:
+        return self._slots[self._find(key)] == key
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the table in bytes."""
+        return len(self._slots) * self._slots.itemsize
+
+
+class BloomFilter:
+    """Bloom filter addressed by 64-bit fingerprints.
+
+    Bit positions are derived from the two 32-bit halves of the
+    fingerprint (double hashing), so no extra hashing of the key is needed.
+
+    Args:
+        nbytes: Size of the bit array in bytes
+    """
+
+    __slots__ = ("_bits", "_size")
+
+    def __init__(self, nbytes: int) -> None:
+        self._bits: bytearray = bytearray(max(nbytes, 1))
+        self._size: int = 8 * len(self._bits)
+
+    def _positions(self, key: int) -> Iterator[int]:
+        low, high = key & 0xFFFFFFFF, key >> 32
+        for i in range(BLOOM_HASHES):
+            yield (low + i * high) % self._size
+
+    def add(self, key: int) -> bool:
+        """Insert a fingerprint.
+
+        Args:
+            key: 64-bit fingerprint
+
+        Returns:
+            True if the fingerprint was definitely not in the filter yet
+        """
+        new = False
+        for position in self._positions(key):
+            mask = 1 << (position & 7)
+            if not self._bits[position >> 3] & mask:
+                self._bits[position >> 3] |= mask
+                new = True
+        return new
+
+    def __contains__(self, key: int) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+@dataclass(frozen=True)
+class DedupeOptions:
+    """Settings for removing duplicate rows during a scan.
+
+    Args:
+        columns: Columns that identify a duplicate, e.g. ``("name", "brand")``
+        memory_limit: Memory budget in bytes for the fingerprints
+        bloom: Keep de-duplicating with a Bloom filter once the exact table
+            is full instead of failing; half of the budget goes to the filter
+    """
+
+    columns: tuple[str, ...]
+    memory_limit: int = DEFAULT_DEDUPE_MEMORY_LIMIT
+    bloom: bool = False
+
+
+class Deduplicator:
+    """Tracks the keys seen during one scan.
+
+    Keys are checked against an exact ``FingerprintSet`` first. When the
+    table reaches its share of the memory budget and ``bloom`` is enabled,
+    new keys go to a ``BloomFilter`` instead; from then on a small fraction
+    of unique rows may be dropped as false positives, but memory stays
+    bounded. Without ``bloom`` a full table raises ``MemoryError``.
+
+    Args:
+        options: De-duplication settings
+    """
+
+    def __init__(self, options: DedupeOptions) -> None:
+        self.options: DedupeOptions = options
+        table_budget = options.memory_limit // 2 if options.bloom else options.memory_limit
+        self.fingerprints: FingerprintSet = FingerprintSet(table_budget)
+        self.overflow: BloomFilter | None = None
+
+    def is_new(self, values: Iterable[str]) -> bool:
+        """Check a row key and remember it.
+
+        Args:
+            values: Key column values of the row
+
+        Returns:
+            True if the key has not been seen before in this scan
+
+        Raises:
+            MemoryError: If the memory limit is reached and ``bloom`` is disabled
+        """
+        key = fingerprint(values)
+        if self.overflow is None:
+            try:
+                return self.fingerprints.add(key)
+            except MemoryError:
+                if not self.options.bloom:
+                    raise
+                self.overflow = BloomFilter(self.options.memory_limit - self.fingerprints.nbytes)
+        if key in self.fingerprints:
+            return False
+        return self.overflow.add(key)
+
+    def filter(self, rows: Iterable[Mapping]) -> Iterator[Mapping]:
+        """Drop rows whose key was already seen.
+
+        Args:
+            rows: Rows of product data
+
+        Yields:
+            First row for every distinct key, in input order
+        """
+        columns = self.options.columns
+        for row in rows:
+            if self.is_new([row[column] for column in columns]):
+                yield row
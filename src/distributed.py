@@ -0,0 +1,354 @@
+"""Distributed aggregation over several hosts.
+
+This module runs the ``SerializeCSV`` + ``BrandReports`` pipeline on
+worker hosts and merges their partial aggregates on a coordinator.
+Workers and coordinator talk over TCP with one JSON request and one JSON
+response per connection, each terminated by a newline:
+
+- request: ``{"files": [...], "columns": [group_column, avg_column],
+  "distinct_column": column or null, "precision": p, "heartbeat": seconds}``
+- response: ``{"status": "ok", "groups": [[group, total, count], ...],
+  "sketches": {group: base64 registers}}`` or ``{"status": "error", "error": "..."}``
+- listing request: ``{"list": [...]}`` with file names, directories or glob
+  patterns; response: ``{"status": "ok", "files": [[...], ...]}`` with the
+  CSV files behind every entry, relative to the data root, and an empty
+  list for entries that match nothing on that worker
+- while a request with ``"heartbeat"`` runs, the worker sends a
+  ``{"status": "running"}`` line every that many seconds before the
+  response, so a busy worker can be told apart from a dead one
+
+File names are resolved against the worker's data root. Every worker lists
+its own files, and a file is only sent to workers that have it; workers
+listing the same relative name are taken to hold replicas of one file,
+which a failed task can be re-sent to. Workers refuse paths that resolve
+outside their data root.
+"""
+
+from __future__ import annotations
+
+import base64
+import glob
+import json
+import os
+import socket
+import socketserver
+import threading
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+
+from src.hll import DEFAULT_PRECISION, HyperLogLog
+from src.reports import AvgAggregate, BrandReports, GroupedAverages
+from src.utils import DEFAULT_DATA_ROOT, SerializeCSV
+
+DEFAULT_TIMEOUT = 60.0
+DEFAULT_RETRIES = 2
+# Heartbeats a running task sends per timeout, so a single late one isn't fatal
+HEARTBEATS_PER_TIMEOUT = 4
+_HEARTBEAT = json.dumps({"status": "running"}).encode() + b"\n"
+# Tasks per worker, so a failed or slow task only re-runs a small share of the input
+TASKS_PER_WORKER = 4
+
+Address = tuple[str, int]
+
+
+class WorkerError(RuntimeError):
+    """Raised when a task fails on every worker it was sent to."""
+
+
+class RemoteFile(NamedTuple):
+    """CSV file found on one or more workers.
+
+    Args:
+        name: File name relative to the workers' data root
+        workers: Workers that have the file, in coordinator order
+    """
+
+    name: str
+    workers: tuple[Address, ...]
+
+
+def parse_address(value: str) -> Address:
+    """Parse a ``host:port`` worker address.
+
+    Args:
+        value: Address string, e.g. ``127.0.0.1:9000``
+
+    Returns:
+        Tuple of host and port
+
+    Raises:
+        ValueError: If the value is not a valid address
+    """
+    host, separator, port = value.rpartition(":")
+    if not separator or not host or not port.isdigit():
+        raise ValueError(f"Invalid address: '{value}', expected host:port")
+    return host, int(port)
+
+
+def encode_result(result: GroupedAverages) -> dict:
+    """Convert a partial aggregate into a JSON-serializable response."""
+    return {
+        "status": "ok",
+        "groups": [[group, state.total, state.count] for group, state in result.groups.items()],
+        "sketches": {group: base64.b64encode(sketch.registers).decode() for group, sketch in result.sketches.items()},
+    }
+
+
+def decode_result(
+    response: dict, columns: tuple[str, str], distinct_column: str | None = None, precision: int = DEFAULT_PRECISION
+) -> GroupedAverages:
+    """Convert a worker response back into a partial aggregate.
+
+    Raises:
+        WorkerError: If the worker reported an error
+    """
+    if response.get("status") != "ok":
+        raise WorkerError(response.get("error", "Unknown worker error"))
+    groups = {group: AvgAggregate(total, count) for group, total, count in response["groups"]}
+    sketches = {
+        group: HyperLogLog(precision, base64.b64decode(registers))
+        for group, registers in response.get("sketches", {}).items()
+    }
+    return GroupedAverages(columns[0], columns[1], groups, distinct_column, sketches)
+
+
+class _WorkerHandler(socketserver.StreamRequestHandler):
+    server: ReportWorker
+
+    def handle(self) -> None:
+        lock, done = threading.Lock(), threading.Event()
+        try:
+            request = json.loads(self.rfile.readline())
+            if request.get("heartbeat"):
+                threading.Thread(target=self._heartbeat, args=(request["heartbeat"], lock, done), daemon=True).start()
+            if "list" in request:
+                response = {"status": "ok", "files": self._list_files(request["list"])}
+            else:
+                response = self._aggregate(request)
+        except Exception as error:  # reported back to the coordinator, which may retry elsewhere
+            response = {"status": "error", "error": f"{type(error).__name__}: {error}"}
+        with lock:
+            done.set()
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+
+    def _heartbeat(self, interval: float, lock: threading.Lock, done: threading.Event) -> None:
+        while not done.wait(interval):
+            with lock:
+                if done.is_set():
+                    return
+                try:
+                    self.wfile.write(_HEARTBEAT)
+                except OSError:
+                    return
+
+    def _list_files(self, entries: list[str]) -> list[list[str]]:
+        data_root = self.server.data_root
+        listing = []
+        for entry in entries:
+            serializer = SerializeCSV((entry,), data_root, confine=True)
+            try:
+                paths = [path for path in serializer.iter_file_paths() if os.path.isfile(path)]
+            except FileNotFoundError:
+                # The entry may still match files on another worker
+                paths = []
+            # Escaped, so file names with glob characters are read back as plain files
+            listing.append([glob.escape(os.path.relpath(path, data_root or os.curdir)) for path in paths])
+        return listing
+
+    def _aggregate(self, request: dict) -> dict:
+        columns = tuple(request["columns"])
+        distinct_column = request.get("distinct_column")
+        precision = request.get("precision", DEFAULT_PRECISION)
+        serializer = SerializeCSV(tuple(request["files"]), self.server.data_root, confine=True)
+        needed = tuple(column for column in (*columns, distinct_column) if column is not None)
+        result = BrandReports.aggregate(serializer.iter_rows(needed), columns, distinct_column, precision)
+        return encode_result(result)
+
+
+class ReportWorker(socketserver.ThreadingTCPServer):
+    """TCP server that aggregates local files on request.
+
+    Every connection is served in its own thread, so one worker can run
+    several tasks at once. Only files inside ``data_root`` are read;
+    absolute paths, ``..`` and symlinks leading elsewhere are rejected.
+
+    Args:
+        address: Host and port to listen on; port 0 picks a free port
+        data_root: Directory requested file names are resolved against
+    """
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, address: Address, data_root: str = DEFAULT_DATA_ROOT) -> None:
+        self.data_root: str = data_root
+        super().__init__(address, _WorkerHandler)
+
+
+class ReportCoordinator:
+    """Dispatches file lists to workers and merges their partial results.
+
+    Every worker first expands the input into the CSV files it has. Files
+    held by the same workers are split into ``TASKS_PER_WORKER`` tasks per
+    worker, and every task is sent to one of those workers. A task that
+    fails, or whose worker doesn't answer within ``timeout`` seconds, is
+    re-sent to the next worker holding a replica of its files, up to
+    ``retries`` times. Workers send heartbeats while they run a request,
+    so ``timeout`` only limits how long a worker may stay silent; a slow
+    task on a live worker is waited for. Workers that couldn't be reached or timed out are
+    skipped for later tasks while healthy replicas remain; errors a worker
+    reports, such as a missing column, don't mark it failed.
+
+    Args:
+        workers: Addresses of the workers
+        timeout: Seconds to wait for a worker to connect, or for its next heartbeat or answer
+        retries: Number of extra attempts per task
+        precision: HyperLogLog precision for distinct counts
+    """
+
+    def __init__(
+        self,
+        workers: Sequence[Address],
+        timeout: float = DEFAULT_TIMEOUT,
+        retries: int = DEFAULT_RETRIES,
+        precision: int = DEFAULT_PRECISION,
+    ) -> None:
+        if not workers:
+            raise ValueError("At least one worker is required")
+        self.workers: tuple[Address, ...] = tuple(workers)
+        self.timeout: float = timeout
+        self.retries: int = retries
+        self.precision: int = precision
+        self._failed: set[Address] = set()
+        self._lock = threading.Lock()
+
+    def _request(self, worker: Address, message: dict) -> dict:
+        # The socket timeout applies to every read, i.e. to the gap between heartbeats
+        message = {**message, "heartbeat": self.timeout / HEARTBEATS_PER_TIMEOUT}
+        with socket.create_connection(worker, timeout=self.timeout) as connection:
+            connection.sendall(json.dumps(message).encode() + b"\n")
+            with connection.makefile("rb") as stream:
+                for line in stream:
+                    response = json.loads(line)
+                    if response.get("status") != "running":
+                        return response
+        raise ConnectionError(f"Worker {worker[0]}:{worker[1]} closed the connection")
+
+    def _pick_worker(self, workers: Sequence[Address], first: int, attempt: int) -> Address:
+        with self._lock:
+            healthy = [worker for worker in workers if worker not in self._failed] or list(workers)
+        return healthy[(first + attempt) % len(healthy)]
+
+    def _call(self, workers: Sequence[Address], index: int, message: dict, task: str) -> dict:
+        errors = []
+        for attempt in range(self.retries + 1):
+            worker = self._pick_worker(workers, index, attempt)
+            try:
+                response = self._request(worker, message)
+            except OSError as error:
+                # Unreachable or timed out (socket timeouts are OSErrors too)
+                errors.append(f"{worker[0]}:{worker[1]}: {error}")
+                with self._lock:
+                    self._failed.add(worker)
+                continue
+            except ValueError as error:
+                errors.append(f"{worker[0]}:{worker[1]}: Invalid response: {error}")
+                continue
+            if response.get("status") == "ok":
+                return response
+            errors.append(f"{worker[0]}:{worker[1]}: {response.get('error', 'Unknown worker error')}")
+        raise WorkerError(f"{task} failed on every attempt: {'; '.join(errors)}")
+
+    def list_files(self, files: Sequence[str]) -> list[RemoteFile]:
+        """Expand file names, directories and glob patterns into single files.
+
+        Every worker expands the entries against its own data root, since
+        the files only need to exist on the workers. Workers that can't be
+        reached are left out, so files only they have are not found.
+
+        Args:
+            files: CSV file names, directories or glob patterns
+
+        Returns:
+            Every CSV file with the workers that have it, entries in input order
+
+        Raises:
+            FileNotFoundError: If an entry matches no file on any reachable worker
+            WorkerError: If a worker reports an error or no worker can be reached
+        """
+        entries = list(files)
+        with ThreadPoolExecutor(max_workers=len(self.workers)) as executor:
+            listings = list(executor.map(lambda worker: self._list_on(worker, entries), self.workers))
+        if all(listing is None for listing in listings):
+            raise WorkerError(f"Listing {entries} failed: no worker could be reached")
+        remote_files, missing = [], []
+        for index, entry in enumerate(entries):
+            holders: dict[str, list[Address]] = {}
+            for worker, listing in zip(self.workers, listings, strict=True):
+                for name in listing[index] if listing is not None else ():
+                    holders.setdefault(name, []).append(worker)
+            if not holders:
+                missing.append(entry)
+            remote_files.extend(RemoteFile(name, tuple(workers)) for name, workers in holders.items())
+        if missing:
+            raise FileNotFoundError(f"No worker has files for: {missing}")
+        return remote_files
+
+    def _list_on(self, worker: Address, entries: list[str]) -> list[list[str]] | None:
+        try:
+            return self._call((worker,), 0, {"list": entries}, f"Listing {entries}")["files"]
+        except WorkerError:
+            with self._lock:
+                if worker in self._failed:
+                    return None
+            raise
+
+    def _run_task(
+        self,
+        index: int,
+        workers: tuple[Address, ...],
+        files: tuple[str, ...],
+        columns: tuple[str, str],
+        distinct_column: str | None,
+    ) -> GroupedAverages:
+        message = {
+            "files": list(files),
+            "columns": list(columns),
+            "distinct_column": distinct_column,
+            "precision": self.precision,
+        }
+        response = self._call(workers, index, message, f"Task {list(files)}")
+        return decode_result(response, columns, distinct_column, self.precision)
+
+    def aggregate(
+        self, files: Sequence[str], columns: tuple[str, str], distinct_column: str | None = None
+    ) -> GroupedAverages:
+        """Aggregate files across the workers.
+
+        Args:
+            files: CSV file names, directories or glob patterns; they are
+                expanded into files first, so the files behind one entry
+                are spread over all workers that have them
+            columns: Tuple of column names for grouping and averaging
+            distinct_column: Column whose distinct values are counted per group
+
+        Returns:
+            Merged ``GroupedAverages`` of all tasks
+
+        Raises:
+            FileNotFoundError: If an entry matches no file on any reachable worker
+            WorkerError: If the listing or a task fails on every attempt
+        """
+        holders: dict[tuple[Address, ...], list[str]] = {}
+        for remote_file in self.list_files(files):
+            holders.setdefault(remote_file.workers, []).append(remote_file.name)
+        tasks = []
+        for workers, names in holders.items():
+            task_count = min(len(names), len(workers) * TASKS_PER_WORKER)
+            tasks.extend((workers, tuple(names[i::task_count])) for i in range(task_count))
+        with ThreadPoolExecutor(max_workers=len(self.workers)) as executor:
+            partials = list(
+                executor.map(lambda item: self._run_task(item[0], *item[1], columns, distinct_column), enumerate(tasks))
+            )
+        return sum(partials, GroupedAverages(*columns, distinct_column=distinct_column))
@@ -0,0 +1,83 @@
+"""HyperLogLog sketches for approximate distinct counts.
+
+A sketch with precision ``p`` keeps ``2**p`` one-byte registers and
+estimates the number of distinct values it has seen with a relative
+standard error of about ``1.04 / sqrt(2**p)``: 1.6% for 4 KiB at the
+default precision of 12. Sketches over different inputs merge with
+``+`` into the sketch of the combined input.
+"""
+
+from __future__ import annotations
+
+import math
+
+from src.dedupe import fingerprint
+
+DEFAULT_PRECISION = 12
+MIN_PRECISION = 4
+MAX_PRECISION = 16
+
+
+class HyperLogLog:
+    """Mergeable sketch of the distinct values in a column.
+
+    Args:
+        precision: Number of index bits; the sketch takes ``2**precision`` bytes
+        registers: Existing register values, e.g. from a serialized sketch
+
+    Raises:
+        ValueError: If the precision or the number of registers is invalid
+    """
+
+    __slots__ = ("precision", "registers")
+
+    def __init__(self, precision: int = DEFAULT_PRECISION, registers: bytes | bytearray | None = None) -> None:
+        if not MIN_PRECISION <= precision <= MAX_PRECISION:
+            raise ValueError(f"Precision must be between {MIN_PRECISION} and {MAX_PRECISION}, got {precision}")
+        self.precision: int = precision
+        self.registers: bytearray = bytearray(registers) if registers is not None else bytearray(1 << precision)
+        if len(self.registers) != 1 << precision:
+            raise ValueError(f"Expected {1 << precision} registers, got {len(self.registers)}")
+
+    def add(self, value: str) -> None:
+        """Record a value.
+
+        Args:
+            value: Column value
+        """
+        key = fingerprint((value,))
+        value_bits = 64 - self.precision
+        index = key >> value_bits
+        rank = value_bits - (key & ((1 << value_bits) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def __add__(self, other: HyperLogLog) -> HyperLogLog:
+        if self.precision != other.precision:
+            raise ValueError("Cannot merge sketches of different precision")
+        return HyperLogLog(self.precision, bytes(map(max, self.registers, other.registers)))
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, HyperLogLog):
+            return NotImplemented
+        return self.precision == other.precision and self.registers == other.registers
+
+    def __repr__(self) -> str:
+        return f"HyperLogLog(precision={self.precision}, estimate={self.estimate()})"
+
+    def estimate(self) -> int:
+        """Estimate the number of distinct values recorded.
+
+        Uses linear counting while many registers are still empty, which
+        keeps small cardinalities nearly exact.
+
+        Returns:
+            Estimated distinct count
+        """
+        size = len(self.registers)
+        alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(size, 0.7213 / (1 + 1.079 / size))
+        raw = alpha * size * size / sum(2.0**-register for register in self.registers)
+        zeros = self.registers.count(0)
+        if raw <= 2.5 * size and zeros:
+            return round(size * math.log(size / zeros))
+        return round(raw)
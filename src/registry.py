@@ -0,0 +1,156 @@
+"""Declarative report registry and scan planning.
+
+Every report type is described by a ``ReportSpec`` naming the columns
+it groups by, averages and optionally counts distinctly. Reports
+requested together are planned as one scan that reads only the union
+of their columns.
+"""
+
+from __future__ import annotations
+
+import tomllib
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+from src.hll import DEFAULT_PRECISION
+from src.reports import BrandReports, GroupedAverages
+from src.utils import SerializeCSV
+
+
+@dataclass(frozen=True)
+class ReportSpec:
+    """Declaration of a report type.
+
+    Args:
+        name: Report name used on the command line
+        group_column: Column the rows are grouped by
+        avg_column: Column whose values are averaged
+        description: Short human-readable description
+        distinct_column: Column whose distinct values are counted per group
+    """
+
+    name: str
+    group_column: str
+    avg_column: str
+    description: str = ""
+    distinct_column: str | None = None
+
+    @property
+    def columns(self) -> tuple[str, str]:
+        """Grouping and averaging columns, as expected by ``BrandReports``."""
+        return self.group_column, self.avg_column
+
+    @property
+    def needed_columns(self) -> tuple[str, ...]:
+        """All columns the report reads."""
+        if self.distinct_column is None:
+            return self.columns
+        return (*self.columns, self.distinct_column)
+
+
+REPORTS: dict[str, ReportSpec] = {}
+
+
+def register_report(spec: ReportSpec) -> ReportSpec:
+    """Add a report type to the registry.
+
+    Args:
+        spec: Declaration of the report
+
+    Returns:
+        The registered spec
+
+    Raises:
+        ValueError: If a report with the same name is already registered
+    """
+    if spec.name in REPORTS:
+        raise ValueError(f"Report '{spec.name}' is already registered")
+    REPORTS[spec.name] = spec
+    return spec
+
+
+def get_report_specs(names: Sequence[str]) -> list[ReportSpec]:
+    """Look up registered reports by name, ignoring repeated names.
+
+    Args:
+        names: Report names
+
+    Returns:
+        Specs in the order of their first occurrence
+
+    Raises:
+        KeyError: If a name is not registered
+    """
+    return [REPORTS[name] for name in dict.fromkeys(names)]
+
+
+def load_report_names(path: str) -> list[str]:
+    """Read report names from a TOML config file.
+
+    The file lists the reports under a top-level ``reports`` key::
+
+        reports = ["average-rating", "average-price"]
+
+    Args:
+        path: Path of the config file
+
+    Returns:
+        Report names from the file
+
+    Raises:
+        ValueError: If the file has no list of report names
+    """
+    with open(path, "rb") as config_file:
+        config = tomllib.load(config_file)
+    names = config.get("reports")
+    if not isinstance(names, list) or not all(isinstance(name, str) for name in names):
+        raise ValueError(f"'{path}' must define reports = [...] as a list of report names")
+    return names
+
+
+class ReportPlan:
+    """Plan for running several reports in one shared scan.
+
+    Args:
+        specs: Reports to compute
+        precision: HyperLogLog precision for distinct counts
+    """
+
+    def __init__(self, specs: Sequence[ReportSpec], precision: int = DEFAULT_PRECISION) -> None:
+        self.specs: tuple[ReportSpec, ...] = tuple(specs)
+        self.precision: int = precision
+        self.columns: tuple[str, ...] = tuple(dict.fromkeys(column for spec in specs for column in spec.needed_columns))
+
+    def run(self, serializer: SerializeCSV) -> dict[str, GroupedAverages]:
+        """Scan the input once and compute every planned report.
+
+        Only the union of the columns of all reports is extracted from
+        each line.
+
+        Args:
+            serializer: Source of the input files
+
+        Returns:
+            Result of every report keyed by report name
+        """
+        rows = serializer.iter_rows(self.columns)
+        results = BrandReports.aggregate_many(
+            rows,
+            [spec.columns for spec in self.specs],
+            [spec.distinct_column for spec in self.specs],
+            self.precision,
+        )
+        return {spec.name: result for spec, result in zip(self.specs, results, strict=True)}
+
+
+register_report(ReportSpec("average-rating", "brand", "rating", "Average product rating by brand"))
+register_report(ReportSpec("average-price", "brand", "price", "Average product price by brand"))
+register_report(
+    ReportSpec(
+        "distinct-products",
+        "brand",
+        "rating",
+        "Average rating and approximate number of distinct products by brand",
+        distinct_column="name",
+    )
+)
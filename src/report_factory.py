@@ -1,13 +1,26 @@
-from __future__ import annotations
-
 """Report factory for generating various types of reports.
 
 This module provides a factory class that integrates CSV data processing
 and report generation components to create end-to-end report workflows.
 """
 
+from __future__ import annotations
+
+import io
+import time
+from collections.abc import Sequence
+from datetime import UTC, datetime
+from typing import TextIO
+
+from src.dedupe import DedupeOptions
+from src.distributed import DEFAULT_RETRIES, DEFAULT_TIMEOUT, Address, ReportCoordinator
+from src.hll import DEFAULT_PRECISION
+from src.registry import ReportPlan, get_report_specs
 from src.reports import BrandReports
-from src.utils import SerializeCSV
+from src.sampling import SampledReports
+from src.spill import SpilledAverages, SpillingReports
+from src.store import Result, ResultStore, RunInfo
+from src.utils import DEFAULT_DATA_ROOT, SerializeCSV
 
 
 class ReportFactory:
@@ -18,24 +31,263 @@ class ReportFactory:
     """
 
     @classmethod
-    def get_report(cls, files: tuple[str, ...], columns: tuple[str, str]) -> str:
+    def get_report(
+        cls,
+        files: tuple[str, ...],
+        columns: tuple[str, str],
+        data_root: str = DEFAULT_DATA_ROOT,
+        sample: float | None = None,
+        dedupe: DedupeOptions | None = None,
+        memory_limit: int | None = None,
+        workers: Sequence[Address] | None = None,
+        worker_timeout: float = DEFAULT_TIMEOUT,
+        worker_retries: int = DEFAULT_RETRIES,
+        distinct_column: str | None = None,
+        precision: int = DEFAULT_PRECISION,
+        store: ResultStore | None = None,
+        report_name: str | None = None,
+        sample_exact_fallback: bool = False,
+    ) -> str:
         """Generate a report from CSV files.
 
         Processes multiple CSV files and generates a report based on
         the specified column combination. This method orchestrates the
-        entire workflow from data reading to report formatting.
+        entire workflow from data reading to report formatting. Rows are
+        streamed from the files into a stateless aggregation, so the
+        method is safe to call repeatedly and from several threads.
+        With ``sample`` only a fraction of the input is read and the
+        report shows estimates with 95% confidence intervals; groups the
+        sample missed are not listed unless ``sample_exact_fallback`` adds
+        a full pass that computes them exactly. With
+        ``dedupe`` repeated rows are dropped while the files are scanned.
+        With ``memory_limit`` group state beyond the budget is spilled to
+        temporary files instead of growing without bound. With ``workers``
+        the files are aggregated by remote workers and only their partial
+        results are merged locally. With ``distinct_column`` the table also
+        shows the approximate number of distinct values of that column per
+        group. With ``store`` the grouped results and the run's metadata are
+        also saved to the result database.
 
         Args:
-            files: Tuple of CSV file names to process
+            files: Tuple of CSV file names, directories or glob patterns to process
             columns: Tuple of column names for grouping and averaging
+            data_root: Directory relative file names are resolved against
+            sample: Fraction of the input to sample for an approximate report
+            dedupe: Settings for dropping duplicate rows across files
+            memory_limit: Budget in bytes for the group state of an exact report
+            workers: Addresses of ``ReportWorker`` servers to distribute the files to
+            worker_timeout: Seconds a worker may stay silent before its task is retried elsewhere
+            worker_retries: Number of extra attempts per distributed task
+            distinct_column: Column whose distinct values are counted per group
+            precision: HyperLogLog precision; each group's sketch takes ``2**precision`` bytes
+            store: Result database to save the report to
+            report_name: Name the report is saved under
+            sample_exact_fallback: Compute groups the sample can't estimate exactly in a full pass
 
         Returns:
             Formatted report table as string
 
         Raises:
             FileNotFoundError: If any of the specified files doesn't exist
+            ValueError: If ``workers`` is combined with sampling, de-duplication or a memory
+                limit, or ``sample`` with ``distinct_column``
+            WorkerError: If a distributed task fails on every attempt
+        """
+        started_at, start = datetime.now(UTC), time.perf_counter()
+        result = cls._aggregate(
+            files,
+            columns,
+            data_root,
+            sample,
+            dedupe,
+            memory_limit,
+            workers,
+            worker_timeout,
+            worker_retries,
+            distinct_column,
+            precision,
+            sample_exact_fallback,
+        )
+        try:
+            if store is not None:
+                run = RunInfo(tuple(files), started_at, time.perf_counter() - start, data_root, sample)
+                store.save(run, {report_name: result})
+            return result.to_table()
+        finally:
+            cls._release(result)
+
+    @staticmethod
+    def _release(result: Result) -> None:
+        # Spilled results keep their runs on disk until closed
+        if isinstance(result, SpilledAverages):
+            result.close()
+
+    @staticmethod
+    def _write_table(result: Result, output: TextIO) -> None:
+        if isinstance(result, SpilledAverages):
+            result.write_table(output)
+        else:
+            output.write(result.to_table())
+
+    @staticmethod
+    def _aggregate(
+        files: tuple[str, ...],
+        columns: tuple[str, str],
+        data_root: str,
+        sample: float | None,
+        dedupe: DedupeOptions | None,
+        memory_limit: int | None,
+        workers: Sequence[Address] | None,
+        worker_timeout: float,
+        worker_retries: int,
+        distinct_column: str | None,
+        precision: int,
+        sample_exact_fallback: bool,
+    ) -> Result:
+        if workers:
+            if sample is not None or dedupe is not None or memory_limit is not None:
+                raise ValueError("Sampling, de-duplication and memory limits are not supported with workers")
+            coordinator = ReportCoordinator(workers, worker_timeout, worker_retries, precision)
+            return coordinator.aggregate(files, columns, distinct_column)
+        serializer = SerializeCSV(files, data_root, dedupe)
+        if sample is not None:
+            if distinct_column is not None:
+                raise ValueError("Distinct counts are not supported for sampled reports")
+            return SampledReports.aggregate(serializer, columns, sample, exact_fallback=sample_exact_fallback)
+        needed = columns if distinct_column is None else (*columns, distinct_column)
+        if memory_limit is not None:
+            rows = serializer.iter_rows(needed)
+            return SpillingReports.aggregate(
+                rows, columns, memory_limit, distinct_column=distinct_column, precision=precision
+            )
+        return BrandReports.aggregate(serializer.iter_rows(needed), columns, distinct_column, precision)
+
+    @classmethod
+    def get_reports(
+        cls,
+        files: tuple[str, ...],
+        report_names: Sequence[str],
+        data_root: str = DEFAULT_DATA_ROOT,
+        sample: float | None = None,
+        dedupe: DedupeOptions | None = None,
+        memory_limit: int | None = None,
+        workers: Sequence[Address] | None = None,
+        worker_timeout: float = DEFAULT_TIMEOUT,
+        worker_retries: int = DEFAULT_RETRIES,
+        precision: int = DEFAULT_PRECISION,
+        store: ResultStore | None = None,
+        sample_exact_fallback: bool = False,
+    ) -> str:
+        """Generate registered reports by name.
+
+        Builds the output of ``write_reports`` as one string; see there
+        for the arguments.
+
+        Returns:
+            Formatted report tables as string
+
+        Raises:
+            KeyError: If a report name is not registered
+            FileNotFoundError: If any of the specified files doesn't exist
+        """
+        output = io.StringIO()
+        cls.write_reports(
+            output,
+            files,
+            report_names,
+            data_root,
+            sample,
+            dedupe,
+            memory_limit,
+            workers,
+            worker_timeout,
+            worker_retries,
+            precision,
+            store,
+            sample_exact_fallback,
+        )
+        return output.getvalue()
+
+    @classmethod
+    def write_reports(
+        cls,
+        output: TextIO,
+        files: tuple[str, ...],
+        report_names: Sequence[str],
+        data_root: str = DEFAULT_DATA_ROOT,
+        sample: float | None = None,
+        dedupe: DedupeOptions | None = None,
+        memory_limit: int | None = None,
+        workers: Sequence[Address] | None = None,
+        worker_timeout: float = DEFAULT_TIMEOUT,
+        worker_retries: int = DEFAULT_RETRIES,
+        precision: int = DEFAULT_PRECISION,
+        store: ResultStore | None = None,
+        sample_exact_fallback: bool = False,
+    ) -> None:
+        """Generate registered reports by name and write them to a stream.
+
+        Looks the reports up in the registry and computes all of them in
+        one shared scan that reads only the columns they need. Sampled,
+        spilling and distributed reports are still computed one report at
+        a time. A single report is written as a bare table; several
+        reports are each preceded by their name. With ``store`` all results
+        are saved under their report names in one transaction. Reports
+        that spilled to disk are streamed to ``output`` from their run
+        files, so writing them stays within ``memory_limit``.
+
+        Args:
+            output: Text stream the tables are written to, without a trailing newline
+            files: Tuple of CSV file names, directories or glob patterns to process
+            report_names: Names of registered reports
+            data_root: Directory relative file names are resolved against
+            sample: Fraction of the input to sample for an approximate report
+            dedupe: Settings for dropping duplicate rows across files
+            memory_limit: Budget in bytes for the group state of an exact report
+            workers: Addresses of ``ReportWorker`` servers to distribute the files to
+            worker_timeout: Seconds a worker may stay silent before its task is retried elsewhere
+            worker_retries: Number of extra attempts per distributed task
+            precision: HyperLogLog precision for reports with distinct counts
+            store: Result database to save the reports to
+            sample_exact_fallback: Compute groups the sample can't estimate exactly in a full pass
+
+        Raises:
+            KeyError: If a report name is not registered
+            FileNotFoundError: If any of the specified files doesn't exist
         """
-        serializer = SerializeCSV(files)
-        full_data = serializer.get_full_data_from_files()
-        report = BrandReports(full_data, columns)
-        return report.get_avg_rating_report()
+        specs = get_report_specs(report_names)
+        started_at, start = datetime.now(UTC), time.perf_counter()
+        if len(specs) > 1 and sample is None and memory_limit is None and not workers:
+            results = ReportPlan(specs, precision).run(SerializeCSV(files, data_root, dedupe))
+        else:
+            results = {}
+            try:
+                for spec in specs:
+                    results[spec.name] = cls._aggregate(
+                        files,
+                        spec.columns,
+                        data_root,
+                        sample,
+                        dedupe,
+                        memory_limit,
+                        workers,
+                        worker_timeout,
+                        worker_retries,
+                        spec.distinct_column,
+                        precision,
+                        sample_exact_fallback,
+                    )
+            except BaseException:
+                for result in results.values():
+                    cls._release(result)
+                raise
+        try:
+            if store is not None:
+                store.save(RunInfo(tuple(files), started_at, time.perf_counter() - start, data_root, sample), results)
+            for index, (name, result) in enumerate(results.items()):
+                if len(results) > 1:
+                    output.write(f"\n\n{name}\n" if index else f"{name}\n")
+                cls._write_table(result, output)
+        finally:
+            for result in results.values():
+                cls._release(result)
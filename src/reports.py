@@ -2,14 +2,151 @@
 
 This module provides classes and methods for generating various types
 of reports from product data, including average rating reports by brand.
+Besides the stateful ``BrandReports`` workflow it offers an immutable
+aggregation API: ``BrandReports.aggregate`` returns a ``GroupedAverages``
+object whose partial results can be combined with ``+``. Next to the
+average it can count distinct values of another column per group with
+mergeable HyperLogLog sketches.
 """
 
 from __future__ import annotations
 
 from collections import defaultdict
+from collections.abc import Iterable, Mapping, Sequence
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import NamedTuple
 
 from tabulate import tabulate
 
+from src.hll import DEFAULT_PRECISION, HyperLogLog
+from src.rows import ColumnarRows, DictionaryColumn
+
+
+@dataclass(frozen=True, slots=True)
+class AvgAggregate:
+    """Partial state of an average: running total and number of values.
+
+    Args:
+        total: Sum of the aggregated values
+        count: Number of aggregated values
+    """
+
+    total: float = 0.0
+    count: int = 0
+
+    def __add__(self, other: AvgAggregate) -> AvgAggregate:
+        return AvgAggregate(self.total + other.total, self.count + other.count)
+
+    @property
+    def average(self) -> float:
+        """Average of the aggregated values rounded to 2 decimal places."""
+        return round(self.total / self.count, 2)
+
+
+class GroupResult(NamedTuple):
+    """Slim result row of a grouped report.
+
+    Args:
+        group: Group value, e.g. the brand name
+        average: Average of the grouped values rounded to 2 decimal places
+        count: Number of grouped values
+        distinct: Approximate number of distinct values, if counted
+    """
+
+    group: str
+    average: float
+    count: int
+    distinct: int | None = None
+
+
+@dataclass(frozen=True)
+class GroupedAverages:
+    """Immutable result of grouping rows and averaging a column.
+
+    Instances never change after creation, so they can be shared between
+    threads freely. Partial results computed over different inputs (files,
+    threads, processes) are merged with ``+`` into a new object.
+
+    Args:
+        group_column: Column the rows are grouped by
+        avg_column: Column whose values are averaged
+        groups: Partial average state for every group value
+        distinct_column: Column whose distinct values are counted, if any
+        sketches: HyperLogLog sketch of ``distinct_column`` for every group value
+    """
+
+    group_column: str
+    avg_column: str
+    groups: Mapping[str, AvgAggregate] = field(default_factory=dict)
+    distinct_column: str | None = None
+    sketches: Mapping[str, HyperLogLog] = field(default_factory=dict)
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "groups", MappingProxyType(dict(self.groups)))
+        object.__setattr__(self, "sketches", MappingProxyType(dict(self.sketches)))
+
+    def __add__(self, other: GroupedAverages) -> GroupedAverages:
+        if not isinstance(other, GroupedAverages):
+            return NotImplemented
+        columns = (self.group_column, self.avg_column, self.distinct_column)
+        if columns != (other.group_column, other.avg_column, other.distinct_column):
+            raise ValueError("Cannot merge averages of different columns")
+        merged = dict(self.groups)
+        for group, state in other.groups.items():
+            merged[group] = merged[group] + state if group in merged else state
+        sketches = dict(self.sketches)
+        for group, sketch in other.sketches.items():
+            sketches[group] = sketches[group] + sketch if group in sketches else sketch
+        return GroupedAverages(self.group_column, self.avg_column, merged, self.distinct_column, sketches)
+
+    def __radd__(self, other: int) -> GroupedAverages:
+        # Lets the built-in sum() start from its default 0
+        if other == 0:
+            return self
+        return NotImplemented
+
+    def results(self) -> list[GroupResult]:
+        """Build slim result rows sorted by average value in descending order.
+
+        Returns:
+            List of ``GroupResult`` tuples
+        """
+        result = [
+            GroupResult(group, state.average, state.count, self._distinct(group))
+            for group, state in self.groups.items()
+        ]
+        result.sort(key=lambda x: x.average, reverse=True)
+        return result
+
+    def rows(self) -> list[dict]:
+        """Build report rows sorted by average value in descending order.
+
+        Returns:
+            List of dictionaries with group value, its average and, if
+            counted, its number of distinct values
+        """
+        rows = []
+        for item in self.results():
+            row = {self.group_column: item.group, self.avg_column: item.average}
+            if self.distinct_column is not None:
+                row[f"distinct {self.distinct_column}"] = item.distinct
+            rows.append(row)
+        return rows
+
+    def _distinct(self, group: str) -> int | None:
+        if self.distinct_column is None:
+            return None
+        return self.sketches[group].estimate()
+
+    def to_table(self) -> str:
+        """Format the grouped averages as a table.
+
+        Returns:
+            Formatted table string ready for display
+        """
+        return tabulate(self.rows(), headers="keys", tablefmt="grid")
+
 
 class BrandReports:
     """Generates reports from product data.
@@ -18,12 +155,13 @@ class BrandReports:
     such as average rating reports grouped by brand or other criteria.
 
     Args:
-        full_data: List of dictionaries containing product data
+        full_data: Rows of product data; any iterable of dictionaries, so
+            rows can be streamed straight from ``SerializeCSV.iter_rows``
         requested_columns: Tuple of column names for grouping and averaging
     """
 
-    def __init__(self, full_data: list[dict], requested_columns: tuple[str, str]) -> None:
-        self.full_data: list[dict] = full_data
+    def __init__(self, full_data: Iterable[dict], requested_columns: tuple[str, str]) -> None:
+        self.full_data: Iterable[dict] = full_data
         self.requested_columns: tuple[str, str] = requested_columns
         self.left_report_column: str = requested_columns[0]
         self.avg_column: str = requested_columns[1]
@@ -31,18 +169,129 @@ class BrandReports:
         self.grouped_request_data: list[dict] = []
         self.grouped_data: list[dict] = []
 
+    @classmethod
+    def aggregate(
+        cls,
+        rows: Iterable[Mapping],
+        columns: tuple[str, str],
+        distinct_column: str | None = None,
+        precision: int = DEFAULT_PRECISION,
+    ) -> GroupedAverages:
+        """Group rows and average a column without keeping any state.
+
+        Rows are consumed in a single pass and only a running total and
+        count are kept per group. Repeated or concurrent calls are
+        independent of each other. A ``ColumnarRows`` table is read column
+        by column without creating row views; if its group column is
+        dictionary-encoded, values are accumulated by integer code without
+        hashing the group keys again. With
+        ``distinct_column`` each group also gets a HyperLogLog sketch of
+        that column's values.
+
+        Args:
+            rows: Rows of product data, e.g. ``SerializeCSV.iter_rows()``
+            columns: Tuple of column names for grouping and averaging
+            distinct_column: Column whose distinct values are counted per group
+            precision: HyperLogLog precision; sketches take ``2**precision`` bytes
+
+        Returns:
+            New ``GroupedAverages`` object with the partial state of every group
+        """
+        if distinct_column is not None:
+            return cls.aggregate_many(rows, [columns], [distinct_column], precision)[0]
+        group_column, avg_column = columns
+        if isinstance(rows, ColumnarRows) and isinstance(rows.columns[group_column], DictionaryColumn):
+            return cls._aggregate_encoded(rows, columns)
+        if isinstance(rows, ColumnarRows):
+            pairs = zip(rows.columns[group_column], rows.columns[avg_column], strict=True)
+        else:
+            pairs = ((row[group_column], row[avg_column]) for row in rows)
+        states: dict[str, list] = {}
+        for group, raw_value in pairs:
+            value = float(raw_value)
+            state = states.get(group)
+            if state is None:
+                states[group] = [value, 1]
+            else:
+                state[0] += value
+                state[1] += 1
+        groups = {group: AvgAggregate(total, count) for group, (total, count) in states.items()}
+        return GroupedAverages(group_column, avg_column, groups)
+
+    @classmethod
+    def aggregate_many(
+        cls,
+        rows: Iterable[Mapping],
+        columns_list: Sequence[tuple[str, str]],
+        distinct_columns: Sequence[str | None] | None = None,
+        precision: int = DEFAULT_PRECISION,
+    ) -> list[GroupedAverages]:
+        """Compute several groupings in one pass over the rows.
+
+        Args:
+            rows: Rows of product data
+            columns_list: Column pairs for grouping and averaging, one per result
+            distinct_columns: Column counted distinctly for each result, or None
+            precision: HyperLogLog precision; sketches take ``2**precision`` bytes
+
+        Returns:
+            New ``GroupedAverages`` object for every column pair, in order
+        """
+        if distinct_columns is None:
+            distinct_columns = [None] * len(columns_list)
+        states: list[dict[str, list]] = [{} for _ in columns_list]
+        plan = list(zip(columns_list, distinct_columns, states, strict=True))
+        for row in rows:
+            for (group_column, avg_column), distinct_column, group_states in plan:
+                value = float(row[avg_column])
+                state = group_states.get(row[group_column])
+                if state is None:
+                    sketch = HyperLogLog(precision) if distinct_column is not None else None
+                    state = group_states[row[group_column]] = [value, 1, sketch]
+                else:
+                    state[0] += value
+                    state[1] += 1
+                if distinct_column is not None:
+                    state[2].add(row[distinct_column])
+        return [
+            GroupedAverages(
+                group_column,
+                avg_column,
+                {group: AvgAggregate(total, count) for group, (total, count, _) in group_states.items()},
+                distinct_column,
+                {group: sketch for group, (_, _, sketch) in group_states.items() if sketch is not None},
+            )
+            for (group_column, avg_column), distinct_column, group_states in plan
+        ]
+
+    @staticmethod
+    def _aggregate_encoded(rows: ColumnarRows, columns: tuple[str, str]) -> GroupedAverages:
+        group_column, avg_column = columns
+        encoded = rows.columns[group_column]
+        totals = [0.0] * len(encoded.values)
+        counts = [0] * len(encoded.values)
+        for code, value in zip(encoded.codes, rows.columns[avg_column], strict=True):
+            totals[code] += float(value)
+            counts[code] += 1
+        groups = {
+            group: AvgAggregate(totals[code], counts[code]) for code, group in enumerate(encoded.values) if counts[code]
+        }
+        return GroupedAverages(group_column, avg_column, groups)
+
     def filter_by_report_columns(self) -> list[dict]:
         """Filter data to include only requested columns.
 
         Extracts only the specified columns from the full dataset,
-        creating a filtered dataset for report generation.
+        creating a filtered dataset for report generation. Every call
+        builds a new list and replaces ``grouped_request_data``.
 
         Returns:
             List of dictionaries containing only requested columns
         """
-        for product in self.full_data:
-            filtered_dict = {key: value for key, value in product.items() if key in self.requested_columns}
-            self.grouped_request_data.append(filtered_dict)
+        self.grouped_request_data = [
+            {key: value for key, value in product.items() if key in self.requested_columns}
+            for product in self.full_data
+        ]
         return self.grouped_request_data
 
     def group_by_avg(self) -> list[dict]:
@@ -50,21 +299,26 @@ class BrandReports:
 
         Groups the filtered data by the left column and calculates
         average values for the right column. Results are sorted by
-        average value in descending order.
+        average value in descending order. Every call builds new values
+        and replaces ``values_data`` and ``grouped_data``.
 
         Returns:
             List of dictionaries with grouped data and average values
         """
+        values_data = defaultdict(list)
         for product in self.grouped_request_data:
             left_column = product[self.left_report_column]
             report_column = product[self.avg_column]
-            self.values_data[left_column].append(float(report_column))
+            values_data[left_column].append(float(report_column))
 
-        for left_column, report_column in self.values_data.items():
+        grouped_data = []
+        for left_column, report_column in values_data.items():
             avg_volume = round(sum(report_column) / len(report_column), 2)
-            self.grouped_data.append({self.left_report_column: left_column, self.avg_column: avg_volume})
+            grouped_data.append({self.left_report_column: left_column, self.avg_column: avg_volume})
 
-        self.grouped_data.sort(key=lambda x: x[self.avg_column], reverse=True)
+        grouped_data.sort(key=lambda x: x[self.avg_column], reverse=True)
+        self.values_data = values_data
+        self.grouped_data = grouped_data
         return self.grouped_data
 
     def get_avg_rating_report(self) -> str:
@@ -0,0 +1,168 @@
+"""Compact row storage.
+
+This module provides a column-oriented container for CSV data. Numeric
+columns are kept in ``array`` buffers of C doubles, low-cardinality
+columns are dictionary-encoded into small integer codes and rows are
+exposed as lightweight ``__slots__`` views, so a table with millions of
+rows carries no per-row dictionary overhead.
+"""
+
+from __future__ import annotations
+
+from array import array
+from collections.abc import Iterable, Iterator, Mapping, Sequence
+
+
+class DictionaryColumn(Sequence):
+    """Dictionary-encoded column of repeating string values.
+
+    Every distinct value is stored once in ``values`` and each row keeps
+    only its integer code in an ``array("I")``. Each appended value is
+    still hashed once to find its code, so encoding moves the hashing to
+    load time: it saves memory, and pays off in time only when the same
+    table is aggregated more than once.
+    """
+
+    __slots__ = ("codes", "values", "_index")
+
+    def __init__(self) -> None:
+        self.codes: array = array("I")
+        self.values: list[str] = []
+        self._index: dict[str, int] = {}
+
+    def append(self, value: str) -> None:
+        """Append a value, assigning it a new code on first occurrence.
+
+        Args:
+            value: Raw string value
+        """
+        code = self._index.get(value)
+        if code is None:
+            code = self._index[value] = len(self.values)
+            self.values.append(value)
+        self.codes.append(code)
+
+    def __getitem__(self, index: int) -> str:
+        return self.values[self.codes[index]]
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+
+class Row(Mapping):
+    """Read-only view of a single row of ``ColumnarRows``.
+
+    Behaves like the dictionary produced by ``csv.DictReader`` but only
+    stores a reference to the table and the row index.
+
+    Args:
+        table: Table the row belongs to
+        index: Position of the row in the table
+    """
+
+    __slots__ = ("_table", "_index")
+
+    def __init__(self, table: ColumnarRows, index: int) -> None:
+        self._table = table
+        self._index = index
+
+    def __getitem__(self, key: str) -> str | float:
+        return self._table.columns[key][self._index]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._table.header)
+
+    def __len__(self) -> int:
+        return len(self._table.header)
+
+    def __repr__(self) -> str:
+        return f"Row({dict(self)!r})"
+
+
+class ColumnarRows(Sequence):
+    """Column-oriented table of CSV rows.
+
+    Values of ``numeric_columns`` are parsed to floats and stored in an
+    ``array("d")``, ``encoded_columns`` are stored as ``DictionaryColumn``
+    and all other columns are kept as lists of strings.
+
+    Args:
+        header: Column names in file order
+        numeric_columns: Columns to store as floats
+        encoded_columns: Low-cardinality columns to dictionary-encode
+    """
+
+    __slots__ = ("header", "columns", "_length")
+
+    def __init__(
+        self, header: Sequence[str], numeric_columns: Iterable[str] = (), encoded_columns: Iterable[str] = ()
+    ) -> None:
+        numeric = set(numeric_columns)
+        encoded = set(encoded_columns)
+        self.header: tuple[str, ...] = tuple(header)
+        self.columns: dict[str, list | array | DictionaryColumn] = {}
+        for name in self.header:
+            if name in numeric:
+                self.columns[name] = array("d")
+            elif name in encoded:
+                self.columns[name] = DictionaryColumn()
+            else:
+                self.columns[name] = []
+        self._length: int = 0
+
+    def append(self, values: Sequence[str]) -> None:
+        """Append one row given as values in ``header`` order.
+
+        The whole row is parsed before any column is touched, so a row
+        that fails leaves the table unchanged.
+
+        Args:
+            values: Raw string values of the row
+
+        Raises:
+            ValueError: If the row has the wrong number of values or a
+                numeric value can't be parsed
+        """
+        if len(values) != len(self.header):
+            raise ValueError(f"Expected {len(self.header)} values, got {len(values)}: {list(values)}")
+        columns = self.columns.values()
+        parsed = [
+            float(value) if isinstance(column, array) else value for column, value in zip(columns, values, strict=True)
+        ]
+        for column, value in zip(columns, parsed, strict=True):
+            column.append(value)
+        self._length += 1
+
+    def extend(self, header: Sequence[str], rows: Iterable[Sequence[str]]) -> None:
+        """Append rows read from a file with the given header.
+
+        Empty records (blank lines) are skipped, as ``csv.DictReader`` does.
+
+        Args:
+            header: Column names of the file, possibly in another order
+            rows: Raw string values of every row, e.g. a ``csv.reader``
+
+        Raises:
+            ValueError: If the file has different columns than the table,
+                or a row can't be appended
+        """
+        if set(header) != set(self.header):
+            raise ValueError(f"Columns {list(header)} don't match {list(self.header)}")
+        order = [list(header).index(name) for name in self.header]
+        reorder = order != list(range(len(order)))
+        for values in rows:
+            if not values:
+                continue
+            if reorder and len(values) == len(order):
+                values = [values[i] for i in order]
+            self.append(values)
+
+    def __getitem__(self, index: int) -> Row:
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("row index out of range")
+        return Row(self, index)
+
+    def __len__(self) -> int:
+        return self._length
@@ -0,0 +1,292 @@
+"""Approximate reports over a sample of the input.
+
+This module estimates grouped averages from a block sample of the CSV
+files and reports a confidence interval for every estimate. Only the
+sampled blocks are read unless an exact fallback is requested, which
+computes groups with too few sampled rows, or missed by the sample,
+exactly in one extra pass over the input.
+"""
+
+from __future__ import annotations
+
+import math
+from collections.abc import Iterable, Iterator, Mapping
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import NamedTuple
+
+from tabulate import tabulate
+
+from src.reports import BrandReports
+from src.utils import DEFAULT_BLOCK_SIZE, SampleStats, SerializeCSV
+
+# Normal quantile for a two-sided 95% confidence interval
+Z_95 = 1.96
+DEFAULT_MIN_GROUP_ROWS = 30
+MISSING_GROUPS_NOTE = "Groups missed by the sample are not listed."
+
+
+@dataclass(frozen=True, slots=True)
+class MomentsAggregate:
+    """Partial state for the mean of a group and its variance under block sampling.
+
+    Rows are sampled in whole blocks, so rows of one block are not
+    independent draws: on sorted or clustered files they tend to be
+    alike. The variance is therefore estimated from the per-block totals
+    ``y`` and row counts ``n`` of the group (a ratio estimator over
+    clusters), not from the individual rows.
+
+    Args:
+        total: Sum of the values, i.e. the sum of ``y`` over blocks
+        count: Number of values, i.e. the sum of ``n`` over blocks
+        total_sq: Sum of ``y**2`` over blocks
+        cross: Sum of ``y * n`` over blocks
+        count_sq: Sum of ``n**2`` over blocks
+        clusters: Number of sampled blocks that contain the group
+        blocks: Number of sampled blocks, including those without the group
+    """
+
+    total: float = 0.0
+    count: int = 0
+    total_sq: float = 0.0
+    cross: float = 0.0
+    count_sq: int = 0
+    clusters: int = 0
+    blocks: int = 0
+
+    @classmethod
+    def of_block(cls, total: float, count: int) -> MomentsAggregate:
+        """Build the state of one sampled block.
+
+        Args:
+            total: Sum of the group's values in the block
+            count: Number of the group's rows in the block
+        """
+        return cls(total, count, total * total, total * count, count * count, 1 if count else 0, 1)
+
+    def __add__(self, other: MomentsAggregate) -> MomentsAggregate:
+        return MomentsAggregate(
+            self.total + other.total,
+            self.count + other.count,
+            self.total_sq + other.total_sq,
+            self.cross + other.cross,
+            self.count_sq + other.count_sq,
+            self.clusters + other.clusters,
+            self.blocks + other.blocks,
+        )
+
+    @property
+    def mean(self) -> float:
+        """Mean of the values."""
+        return self.total / self.count
+
+    @property
+    def margin(self) -> float:
+        """Half-width of the 95% confidence interval of the mean.
+
+        Infinite unless the group was seen in at least two blocks, since a
+        single block says nothing about the variation between blocks.
+        """
+        if self.clusters < 2:
+            return math.inf
+        ratio = self.mean
+        residual = self.total_sq - 2 * ratio * self.cross + ratio * ratio * self.count_sq
+        variance = self.blocks / (self.blocks - 1) * max(residual, 0.0) / (self.count * self.count)
+        return Z_95 * math.sqrt(variance)
+
+
+class GroupEstimate(NamedTuple):
+    """Estimated average of one group.
+
+    Args:
+        group: Group value, e.g. the brand name
+        average: Estimated average rounded to 2 decimal places
+        margin: Half-width of the 95% confidence interval, 0 for exact values
+        count: Number of rows the value is based on
+        exact: Whether the value was computed over all rows of the group
+    """
+
+    group: str
+    average: float
+    margin: float
+    count: int
+    exact: bool
+
+
+@dataclass(frozen=True)
+class SampledAverages:
+    """Immutable result of a sampled report.
+
+    Args:
+        group_column: Column the rows are grouped by
+        avg_column: Column whose values are averaged
+        estimates: Estimate for every group value
+        input_rows: Number of rows in the input, exact or estimated, if known
+        complete: Whether every group of the input has an estimate; groups
+            missed by the sample are otherwise missing
+    """
+
+    group_column: str
+    avg_column: str
+    estimates: Mapping[str, GroupEstimate] = field(default_factory=dict)
+    input_rows: int | None = None
+    complete: bool = True
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "estimates", MappingProxyType(dict(self.estimates)))
+
+    def results(self) -> list[GroupEstimate]:
+        """Build result rows sorted by average value in descending order.
+
+        Returns:
+            List of ``GroupEstimate`` tuples
+        """
+        return sorted(self.estimates.values(), key=lambda x: x.average, reverse=True)
+
+    def to_table(self) -> str:
+        """Format the estimates with their confidence intervals as a table.
+
+        If the result is not complete, a note below the table says that
+        groups missed by the sample are not listed.
+
+        Returns:
+            Formatted table string ready for display
+        """
+        rows = [
+            {
+                self.group_column: item.group,
+                self.avg_column: item.average,
+                "±95%": "exact" if item.exact else round(item.margin, 2),
+                "rows": item.count,
+            }
+            for item in self.results()
+        ]
+        table = tabulate(rows, headers="keys", tablefmt="grid")
+        if self.complete:
+            return table
+        return f"{table}\n{MISSING_GROUPS_NOTE}" if table else MISSING_GROUPS_NOTE
+
+
+class SampledReports:
+    """Generates approximate grouped averages from a block sample."""
+
+    @staticmethod
+    def aggregate_moments(blocks: Iterable[Iterable[Mapping]], columns: tuple[str, str]) -> dict[str, MomentsAggregate]:
+        """Collect mean and variance state for every group.
+
+        Args:
+            blocks: Rows of product data grouped by sampled block, e.g.
+                ``SerializeCSV.iter_sampled_blocks()``
+            columns: Tuple of column names for grouping and averaging
+
+        Returns:
+            Dictionary of group value to its ``MomentsAggregate``
+        """
+        group_column, avg_column = columns
+        # total, count, total_sq, cross, count_sq, clusters per group
+        states: dict[str, list] = {}
+        block_count = 0
+        for block in blocks:
+            block_count += 1
+            block_states: dict[str, list] = {}
+            for row in block:
+                value = float(row[avg_column])
+                block_state = block_states.get(row[group_column])
+                if block_state is None:
+                    block_states[row[group_column]] = [value, 1]
+                else:
+                    block_state[0] += value
+                    block_state[1] += 1
+            for group, (total, count) in block_states.items():
+                state = states.setdefault(group, [0.0, 0, 0.0, 0.0, 0, 0])
+                state[0] += total
+                state[1] += count
+                state[2] += total * total
+                state[3] += total * count
+                state[4] += count * count
+                state[5] += 1
+        return {group: MomentsAggregate(*state, block_count) for group, state in states.items()}
+
+    @classmethod
+    def aggregate(
+        cls,
+        serializer: SerializeCSV,
+        columns: tuple[str, str],
+        rate: float,
+        min_group_rows: int = DEFAULT_MIN_GROUP_ROWS,
+        block_size: int = DEFAULT_BLOCK_SIZE,
+        seed: int | None = None,
+        exact_fallback: bool = False,
+    ) -> SampledAverages:
+        """Estimate grouped averages from a block sample of the input files.
+
+        Confidence intervals account for the rows being sampled in whole
+        blocks. Only the sampled blocks are read: every group seen in the
+        sample gets an estimate, groups seen in a single block an infinite
+        interval, and groups the sample missed are not listed. The number
+        of input rows is scaled up from the sampled bytes. If every block
+        was sampled, all values are exact.
+
+        With ``exact_fallback`` groups with fewer than ``min_group_rows``
+        sampled rows or seen in only one block are computed exactly
+        instead, together with the groups missed by the sample, so every
+        group of the input is reported. This costs one extra pass that
+        reads the group and value columns of every row and also counts the
+        input rows exactly.
+
+        Args:
+            serializer: Source of the input files
+            columns: Tuple of column names for grouping and averaging
+            rate: Fraction of file blocks to sample, between 0 and 1
+            min_group_rows: Minimum sampled rows for an estimate with ``exact_fallback``
+            block_size: Size of a sampling block in bytes
+            seed: Seed for the random block selection
+            exact_fallback: Compute small and missed groups in a full pass
+
+        Returns:
+            New ``SampledAverages`` object with an estimate for every listed group
+        """
+        group_column, avg_column = columns
+        stats = SampleStats()
+        moments = cls.aggregate_moments(serializer.iter_sampled_blocks(rate, block_size, seed, stats), columns)
+        if stats.complete:
+            estimates = {
+                group: GroupEstimate(group, round(state.mean, 2), 0.0, state.count, True)
+                for group, state in moments.items()
+            }
+            return SampledAverages(group_column, avg_column, estimates, sum(state.count for state in moments.values()))
+        if not exact_fallback:
+            estimates = {
+                group: GroupEstimate(group, round(state.mean, 2), state.margin, state.count, False)
+                for group, state in moments.items()
+            }
+            return SampledAverages(group_column, avg_column, estimates, cls._estimate_rows(moments, stats), False)
+
+        estimates = {
+            group: GroupEstimate(group, round(state.mean, 2), state.margin, state.count, False)
+            for group, state in moments.items()
+            if state.count >= min_group_rows and state.clusters >= 2
+        }
+        input_rows = 0
+
+        def unestimated_rows() -> Iterator[dict]:
+            # The exact pass reads every row, so it also counts the input
+            nonlocal input_rows
+            for row in serializer.iter_rows(columns):
+                input_rows += 1
+                if row[group_column] not in estimates:
+                    yield row
+
+        exact = BrandReports.aggregate(unestimated_rows(), columns)
+        for group, state in exact.groups.items():
+            estimates[group] = GroupEstimate(group, state.average, 0.0, state.count, True)
+
+        return SampledAverages(group_column, avg_column, estimates, input_rows)
+
+    @staticmethod
+    def _estimate_rows(moments: Mapping[str, MomentsAggregate], stats: SampleStats) -> int | None:
+        # Rows are spread evenly enough over the bytes of a file to scale by size
+        if not stats.sampled_bytes:
+            return None
+        sampled_rows = sum(state.count for state in moments.values())
+        return round(sampled_rows * stats.total_bytes / stats.sampled_bytes)
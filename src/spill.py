@@ -0,0 +1,386 @@
+"""External aggregation for high-cardinality groupings.
+
+This module aggregates rows under a memory budget. When the estimated
+size of the per-group state exceeds the budget, the partial states are
+hash-partitioned into temporary files and the in-memory state is
+cleared. After the scan every partition is merged on its own; a
+partition that still doesn't fit is split again with other bits of the
+hash. Every merged partition is written out as a run of final results
+sorted by average, and the report is streamed from a merge of the runs,
+so at no point are all groups in memory.
+"""
+
+from __future__ import annotations
+
+import heapq
+import io
+import os
+import pickle
+import sys
+import tempfile
+import zlib
+from collections.abc import Iterable, Iterator, Mapping
+from typing import TextIO
+
+from src.hll import DEFAULT_PRECISION, HyperLogLog
+from src.reports import AvgAggregate, GroupedAverages, GroupResult
+
+DEFAULT_PARTITIONS = 16
+# Approximate bytes per group besides its key: dict slot, state list, float and int
+GROUP_STATE_OVERHEAD = 200
+# Approximate bytes per result read back from a run file
+RESULT_SIZE = 200
+# Runs merged at once; their read chunks share a quarter of the budget
+MERGE_FAN_IN = 16
+_HASH_RANGE = 1 << 32
+
+
+def _partition(group: str, partitions: int, depth: int = 0) -> int:
+    # Each level of re-partitioning uses the next digit of the hash
+    return zlib.crc32(group.encode()) // partitions**depth % partitions
+
+
+def _result_key(item: GroupResult) -> tuple[float, str]:
+    return -item.average, item.group
+
+
+def _read_chunks(path: str) -> Iterator[list]:
+    with open(path, "rb") as chunk_file:
+        while True:
+            try:
+                yield pickle.load(chunk_file)
+            except EOFError:
+                return
+
+
+def _write_run(path: str, results: Iterable[GroupResult], chunk_size: int) -> None:
+    with open(path, "wb") as run_file:
+        chunk = []
+        for item in results:
+            chunk.append(tuple(item))
+            if len(chunk) == chunk_size:
+                pickle.dump(chunk, run_file, protocol=pickle.HIGHEST_PROTOCOL)
+                chunk = []
+        if chunk:
+            pickle.dump(chunk, run_file, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _read_run(path: str) -> Iterator[GroupResult]:
+    for chunk in _read_chunks(path):
+        for item in chunk:
+            yield GroupResult(*item)
+
+
+def _format_number(value: float | int) -> str:
+    return format(value, "g") if isinstance(value, float) else str(value)
+
+
+def _decimals(text: str) -> int:
+    # Characters after the decimal point or exponent, -1 for integers (as tabulate counts them)
+    position = text.rfind(".")
+    if position < 0:
+        position = text.lower().rfind("e")
+    return len(text) - position - 1 if position >= 0 else -1
+
+
+class SpilledAverages:
+    """Result of a spilled aggregation, kept on disk in runs sorted by average.
+
+    Results are read back lazily, so reports over more groups than fit
+    into memory can be iterated and written out within the budget. The
+    run files live in a temporary directory that is removed by ``close``,
+    on leaving a ``with`` block or when the object is garbage collected.
+
+    Args:
+        group_column: Column the rows were grouped by
+        avg_column: Column whose values were averaged
+        distinct_column: Column whose distinct values were counted, if any
+        directory: Temporary directory holding the run files
+        runs: Paths of the run files, each sorted by average
+    """
+
+    def __init__(
+        self,
+        group_column: str,
+        avg_column: str,
+        distinct_column: str | None,
+        directory: tempfile.TemporaryDirectory,
+        runs: list[str],
+    ) -> None:
+        self.group_column: str = group_column
+        self.avg_column: str = avg_column
+        self.distinct_column: str | None = distinct_column
+        self._directory = directory
+        self._runs: list[str] = runs
+
+    def __enter__(self) -> SpilledAverages:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Remove the run files."""
+        self._directory.cleanup()
+
+    def results(self) -> Iterator[GroupResult]:
+        """Stream result rows sorted by average value in descending order.
+
+        Ties are ordered by group value.
+
+        Yields:
+            ``GroupResult`` tuples
+        """
+        return heapq.merge(*(_read_run(path) for path in self._runs), key=_result_key)
+
+    def rows(self) -> Iterator[dict]:
+        """Stream report rows sorted by average value in descending order.
+
+        Yields:
+            Dictionary with group value, its average and, if counted, its
+            number of distinct values
+        """
+        for item in self.results():
+            row = {self.group_column: item.group, self.avg_column: item.average}
+            if self.distinct_column is not None:
+                row[f"distinct {self.distinct_column}"] = item.distinct
+            yield row
+
+    def write_table(self, stream: TextIO) -> None:
+        """Write the results as a grid table without loading them into memory.
+
+        The results are read twice: once to measure the columns and once
+        to write the rows. The layout matches ``GroupedAverages.to_table``;
+        group values are always aligned as text.
+
+        Args:
+            stream: Text stream the table is written to
+        """
+        headers = [self.group_column, self.avg_column]
+        if self.distinct_column is not None:
+            headers.append(f"distinct {self.distinct_column}")
+        numeric = [False] + [True] * (len(headers) - 1)
+        # Numbers are padded on the right so their decimal points line up, so a
+        # column is as wide as its longest integer part plus its most decimals
+        integer_widths = [0] * len(headers)
+        decimals = [-1 if is_numeric else 0 for is_numeric in numeric]
+        empty = True
+        for item in self.results():
+            empty = False
+            for index, text in enumerate(self._texts(item)):
+                decimal = _decimals(text) if numeric[index] else 0
+                decimals[index] = max(decimals[index], decimal)
+                integer_widths[index] = max(integer_widths[index], len(text) - decimal)
+        if empty:
+            return
+        widths = [
+            max(len(header) + 2, integer_width + decimal)
+            for header, integer_width, decimal in zip(headers, integer_widths, decimals, strict=True)
+        ]
+
+        def line(fill: str) -> str:
+            return "+" + "+".join(fill * (width + 2) for width in widths) + "+"
+
+        def cells(values: list[str]) -> str:
+            aligned = [
+                value.rjust(width) if is_numeric else value.ljust(width)
+                for value, width, is_numeric in zip(values, widths, numeric, strict=True)
+            ]
+            return "| " + " | ".join(aligned) + " |"
+
+        stream.write(line("-") + "\n" + cells(headers) + "\n" + line("="))
+        for item in self.results():
+            values = [
+                text + " " * (decimals[index] - _decimals(text)) if numeric[index] else text
+                for index, text in enumerate(self._texts(item))
+            ]
+            stream.write("\n" + cells(values) + "\n" + line("-"))
+
+    def _texts(self, item: GroupResult) -> list[str]:
+        texts = [item.group, _format_number(item.average)]
+        if self.distinct_column is not None:
+            texts.append(_format_number(item.distinct))
+        return texts
+
+    def to_table(self) -> str:
+        """Format the results as a table.
+
+        Unlike ``write_table`` this builds the whole table as one string.
+
+        Returns:
+            Formatted table string ready for display
+        """
+        buffer = io.StringIO()
+        self.write_table(buffer)
+        return buffer.getvalue()
+
+
+class SpillingReports:
+    """Generates grouped averages that spill to disk under memory pressure."""
+
+    @staticmethod
+    def _state_size(group: str, sketch: HyperLogLog | None) -> int:
+        size = sys.getsizeof(group) + GROUP_STATE_OVERHEAD
+        return size + len(sketch.registers) if sketch is not None else size
+
+    @staticmethod
+    def _spill(states: dict[str, list], prefix: str, partitions: int, depth: int = 0) -> None:
+        chunks: list[list[tuple]] = [[] for _ in range(partitions)]
+        for group, (total, count, sketch) in states.items():
+            chunks[_partition(group, partitions, depth)].append((group, total, count, sketch))
+        for index, chunk in enumerate(chunks):
+            if chunk:
+                with open(f"{prefix}-{index}.pkl", "ab") as partition_file:
+                    pickle.dump(chunk, partition_file, protocol=pickle.HIGHEST_PROTOCOL)
+        states.clear()
+
+    @classmethod
+    def _merge_partition(cls, path: str, memory_limit: int, partitions: int, depth: int) -> Iterator[dict[str, list]]:
+        # Yields the final states of the partition, split into parts that fit into the budget
+        prefix = path.removesuffix(".pkl")
+        can_split = partitions > 1 and partitions ** (depth + 2) <= _HASH_RANGE
+        merged: dict[str, list] = {}
+        used = 0
+        spilled = False
+        for chunk in _read_chunks(path):
+            for group, total, count, sketch in chunk:
+                state = merged.get(group)
+                if state is not None:
+                    state[0] += total
+                    state[1] += count
+                    if sketch is not None:
+                        state[2] = state[2] + sketch
+                    continue
+                merged[group] = [total, count, sketch]
+                used += cls._state_size(group, sketch)
+                if used > memory_limit and can_split:
+                    cls._spill(merged, prefix, partitions, depth + 1)
+                    spilled = True
+                    used = 0
+        os.remove(path)
+        if not spilled:
+            yield merged
+            return
+        cls._spill(merged, prefix, partitions, depth + 1)
+        for index in range(partitions):
+            sub_path = f"{prefix}-{index}.pkl"
+            if os.path.exists(sub_path):
+                yield from cls._merge_partition(sub_path, memory_limit, partitions, depth + 1)
+
+    @staticmethod
+    def _merge_runs(directory: str, runs: list[str], chunk_size: int) -> list[str]:
+        # Merges runs in rounds of MERGE_FAN_IN, so only that many chunks are read at once
+        round_index = 0
+        while len(runs) > MERGE_FAN_IN:
+            merged_runs = []
+            for start in range(0, len(runs), MERGE_FAN_IN):
+                group = runs[start : start + MERGE_FAN_IN]
+                path = os.path.join(directory, f"run-{round_index}-{start}.pkl")
+                _write_run(path, heapq.merge(*(_read_run(run) for run in group), key=_result_key), chunk_size)
+                for run in group:
+                    os.remove(run)
+                merged_runs.append(path)
+            runs = merged_runs
+            round_index += 1
+        return runs
+
+    @classmethod
+    def _write_runs(cls, directory: str, memory_limit: int, partitions: int, distinct: bool) -> list[str]:
+        chunk_size = max(1, memory_limit // 4 // (MERGE_FAN_IN * RESULT_SIZE))
+        runs = []
+        for index in range(partitions):
+            path = os.path.join(directory, f"partition-{index}.pkl")
+            if not os.path.exists(path):
+                continue
+            # Partitions hold disjoint groups, so each part is final once merged
+            for states in cls._merge_partition(path, memory_limit, partitions, 0):
+                results = [
+                    GroupResult(group, round(total / count, 2), count, sketch.estimate() if distinct else None)
+                    for group, (total, count, sketch) in states.items()
+                ]
+                states.clear()
+                results.sort(key=_result_key)
+                run = os.path.join(directory, f"run-{len(runs)}.pkl")
+                _write_run(run, results, chunk_size)
+                runs.append(run)
+        return cls._merge_runs(directory, runs, chunk_size)
+
+    @classmethod
+    def aggregate(
+        cls,
+        rows: Iterable[Mapping],
+        columns: tuple[str, str],
+        memory_limit: int,
+        partitions: int = DEFAULT_PARTITIONS,
+        temp_dir: str | None = None,
+        distinct_column: str | None = None,
+        precision: int = DEFAULT_PRECISION,
+    ) -> GroupedAverages | SpilledAverages:
+        """Group rows and average a column within a memory budget.
+
+        Works like ``BrandReports.aggregate`` while the group state fits
+        into ``memory_limit`` and then returns a ``GroupedAverages``.
+        Beyond that, partial states are written to ``partitions`` temporary
+        files. Once all rows are consumed, each partition is merged on its
+        own and split again if it still exceeds the budget. Its final
+        results are written to a run sorted by average. The returned
+        ``SpilledAverages`` streams the report from those runs, so neither
+        the merge nor the output needs all groups in memory. The memory
+        estimate covers the group state, including HyperLogLog sketches.
+
+        Args:
+            rows: Rows of product data
+            columns: Tuple of column names for grouping and averaging
+            memory_limit: Budget in bytes for the in-memory group state
+            partitions: Number of spill files the groups are split into
+            temp_dir: Directory for spill files, the system default if None
+            distinct_column: Column whose distinct values are counted per group
+            precision: HyperLogLog precision; sketches take ``2**precision`` bytes
+
+        Returns:
+            ``GroupedAverages`` if nothing was spilled, else ``SpilledAverages``
+            that must be closed to remove its files
+        """
+        group_column, avg_column = columns
+        states: dict[str, list] = {}
+        used = 0
+        directory = tempfile.TemporaryDirectory(prefix="avgrating-spill-", dir=temp_dir)
+        try:
+            spilled = False
+            for row in rows:
+                value = float(row[avg_column])
+                group = row[group_column]
+                state = states.get(group)
+                if state is not None:
+                    state[0] += value
+                    state[1] += 1
+                    if distinct_column is not None:
+                        state[2].add(row[distinct_column])
+                    continue
+                sketch = None
+                if distinct_column is not None:
+                    sketch = HyperLogLog(precision)
+                    sketch.add(row[distinct_column])
+                states[group] = [value, 1, sketch]
+                used += cls._state_size(group, sketch)
+                if used > memory_limit:
+                    cls._spill(states, os.path.join(directory.name, "partition"), partitions)
+                    spilled = True
+                    used = 0
+
+            if not spilled:
+                directory.cleanup()
+                return GroupedAverages(
+                    group_column,
+                    avg_column,
+                    {group: AvgAggregate(total, count) for group, (total, count, _) in states.items()},
+                    distinct_column,
+                    {group: sketch for group, (_, _, sketch) in states.items() if sketch is not None},
+                )
+
+            cls._spill(states, os.path.join(directory.name, "partition"), partitions)
+            runs = cls._write_runs(directory.name, memory_limit, partitions, distinct_column is not None)
+        except BaseException:
+            directory.cleanup()
+            raise
+        return SpilledAverages(group_column, avg_column, distinct_column, directory, runs)
@@ -0,0 +1,284 @@
+"""Local SQLite store for report results.
+
+This module keeps the grouped results of every stored report run in an
+embedded SQLite database together with the run's metadata (inputs, row
+counts, timings). Runs are indexed by column pair and start time and
+results are keyed by run and group value, so the history of a group's
+average across runs is read without re-aggregating the raw CSV files.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+from collections.abc import Mapping
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from typing import NamedTuple
+
+from tabulate import tabulate
+
+from src.reports import GroupedAverages
+from src.sampling import SampledAverages
+from src.spill import SpilledAverages
+from src.utils import DEFAULT_DATA_ROOT
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    report TEXT,
+    group_column TEXT NOT NULL,
+    avg_column TEXT NOT NULL,
+    distinct_column TEXT,
+    inputs TEXT NOT NULL,
+    data_root TEXT NOT NULL,
+    sample REAL,
+    rows INTEGER NOT NULL,
+    input_rows INTEGER,
+    started_at TEXT NOT NULL,
+    elapsed REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS results (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    group_value TEXT NOT NULL,
+    average REAL NOT NULL,
+    rows INTEGER NOT NULL,
+    distinct_count INTEGER,
+    margin REAL,
+    PRIMARY KEY (run_id, group_value)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS runs_by_columns ON runs (group_column, avg_column, started_at);
+"""
+
+Result = GroupedAverages | SampledAverages | SpilledAverages
+
+
+def parse_timestamp(value: str) -> datetime:
+    """Parse an ISO 8601 date or time, e.g. ``2024-05-01`` or ``2024-05-01T12:00+02:00``.
+
+    Args:
+        value: Date or time string; times without an offset are taken as UTC
+
+    Returns:
+        Timezone-aware datetime
+
+    Raises:
+        ValueError: If the value is not an ISO 8601 date or time
+    """
+    timestamp = datetime.fromisoformat(value)
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=UTC)
+    return timestamp
+
+
+@dataclass(frozen=True)
+class RunInfo:
+    """Metadata of a report run.
+
+    Args:
+        inputs: CSV file names, directories or glob patterns that were read
+        started_at: Time the run started
+        elapsed: Seconds the aggregation took; reports computed in one call share it
+        data_root: Directory the inputs were resolved against
+        sample: Sampled fraction of the input, if the run was approximate
+    """
+
+    inputs: tuple[str, ...]
+    started_at: datetime
+    elapsed: float
+    data_root: str = DEFAULT_DATA_ROOT
+    sample: float | None = None
+
+
+class HistoryPoint(NamedTuple):
+    """Stored result of one group in one run.
+
+    Args:
+        started_at: Start time of the run, as an ISO 8601 string in UTC
+        group: Group value, e.g. the brand name
+        average: Average of the grouped values
+        count: Number of grouped values
+        distinct: Approximate number of distinct values, if counted
+        report: Name of the report, if the run was named
+    """
+
+    started_at: str
+    group: str
+    average: float
+    count: int
+    distinct: int | None
+    report: str | None
+
+
+class ResultStore:
+    """SQLite database of report results.
+
+    The schema is created on first use. The store is a context manager
+    that closes the connection on exit.
+
+    Args:
+        path: Path of the database file, or ``:memory:``
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path: str = path
+        self.connection: sqlite3.Connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        self.connection.executescript(_SCHEMA)
+
+    def __enter__(self) -> ResultStore:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Close the database connection."""
+        self.connection.close()
+
+    def save(self, run: RunInfo, results: Mapping[str | None, Result]) -> list[int]:
+        """Store the results of a run in one transaction.
+
+        Every result becomes a row in ``runs`` and its groups are streamed
+        into a single ``executemany`` call. ``rows`` is the number of rows
+        behind the stored averages and ``input_rows`` the number of rows
+        read from the input; they differ for sampled runs, where
+        estimates are computed from a fraction of the rows.
+
+        Args:
+            run: Metadata shared by the results
+            results: Results keyed by report name, or None for unnamed reports
+
+        Returns:
+            Ids of the stored runs, in order
+        """
+        run_ids = []
+        with self.connection:
+            for report, result in results.items():
+                rows = sum(item.count for item in result.results())
+                input_rows = result.input_rows if isinstance(result, SampledAverages) else rows
+                cursor = self.connection.execute(
+                    "INSERT INTO runs (report, group_column, avg_column, distinct_column, inputs, data_root, sample,"
+                    " rows, input_rows, started_at, elapsed) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        report,
+                        result.group_column,
+                        result.avg_column,
+                        getattr(result, "distinct_column", None),
+                        json.dumps(run.inputs),
+                        run.data_root,
+                        run.sample,
+                        rows,
+                        input_rows,
+                        run.started_at.astimezone(UTC).isoformat(),
+                        run.elapsed,
+                    ),
+                )
+                run_id = cursor.lastrowid
+                if isinstance(result, SampledAverages):
+                    items = (
+                        (run_id, item.group, item.average, item.count, None, None if item.exact else item.margin)
+                        for item in result.results()
+                    )
+                else:
+                    items = (
+                        (run_id, item.group, item.average, item.count, item.distinct, None) for item in result.results()
+                    )
+                self.connection.executemany(
+                    "INSERT INTO results (run_id, group_value, average, rows, distinct_count, margin)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    items,
+                )
+                run_ids.append(run_id)
+        return run_ids
+
+    def history(
+        self,
+        columns: tuple[str, str],
+        group: str | None = None,
+        report: str | None = None,
+        since: datetime | None = None,
+    ) -> list[HistoryPoint]:
+        """Read the stored averages of a column pair over time.
+
+        Args:
+            columns: Tuple of column names for grouping and averaging
+            group: Only return this group value
+            report: Only return runs stored under this report name
+            since: Only return runs started at or after this time
+
+        Returns:
+            ``HistoryPoint`` tuples ordered by group value and start time
+        """
+        query, parameters = self.history_query(columns, group, report, since)
+        return [HistoryPoint(*row) for row in self.connection.execute(query, parameters)]
+
+    @staticmethod
+    def history_query(
+        columns: tuple[str, str],
+        group: str | None = None,
+        report: str | None = None,
+        since: datetime | None = None,
+    ) -> tuple[str, list]:
+        """Build the SQL query ``history`` runs, e.g. to inspect its plan.
+
+        Runs are found through ``runs_by_columns`` and each run's result
+        for a group through the primary key of ``results``. With ``group``
+        the index already yields the runs by start time, so the series is
+        streamed without sorting.
+
+        Args:
+            columns: Tuple of column names for grouping and averaging
+            group: Only return this group value
+            report: Only return runs stored under this report name
+            since: Only return runs started at or after this time
+
+        Returns:
+            Tuple of the query and its parameters
+        """
+        query = (
+            "SELECT runs.started_at, results.group_value, results.average, results.rows, results.distinct_count,"
+            " runs.report FROM runs JOIN results ON results.run_id = runs.id"
+            " WHERE runs.group_column = ? AND runs.avg_column = ?"
+        )
+        parameters: list = list(columns)
+        if group is not None:
+            query += " AND results.group_value = ?"
+            parameters.append(group)
+        if report is not None:
+            query += " AND runs.report = ?"
+            parameters.append(report)
+        if since is not None:
+            query += " AND runs.started_at >= ?"
+            parameters.append(since.astimezone(UTC).isoformat())
+        if group is None:
+            query += " ORDER BY results.group_value, runs.started_at, runs.id"
+        else:
+            query += " ORDER BY runs.started_at, runs.id"
+        return query, parameters
+
+    def history_table(
+        self,
+        columns: tuple[str, str],
+        group: str | None = None,
+        report: str | None = None,
+        since: datetime | None = None,
+    ) -> str:
+        """Format the stored averages of a column pair over time as a table.
+
+        Args:
+            columns: Tuple of column names for grouping and averaging
+            group: Only return this group value
+            report: Only return runs stored under this report name
+            since: Only return runs started at or after this time
+
+        Returns:
+            Formatted table string ready for display
+        """
+        rows = []
+        for point in self.history(columns, group, report, since):
+            row = {"run": point.started_at, columns[0]: point.group, columns[1]: point.average, "rows": point.count}
+            if point.distinct is not None:
+                row["distinct"] = point.distinct
+            rows.append(row)
+        return tabulate(rows, headers="keys", tablefmt="grid")
@@ -7,6 +7,62 @@ converting them into structured data format for further processing.
 from __future__ import annotations
 
 import csv
+import glob
+import os
+import random
+import re
+from collections.abc import Iterable, Iterator, Sequence
+from dataclasses import dataclass
+
+from src.dedupe import DedupeOptions, Deduplicator
+from src.rows import ColumnarRows
+
+DEFAULT_DATA_ROOT = "data"
+DEFAULT_BLOCK_SIZE = 64 * 1024
+_SIZE_UNITS = {"": 1, "K": 1024, "M": 1024**2, "G": 1024**3, "T": 1024**4}
+_GLOB_CHARS = "*?["
+
+
+def _is_pattern(name: str) -> bool:
+    return any(char in name for char in _GLOB_CHARS)
+
+
+@dataclass(slots=True)
+class SampleStats:
+    """Byte counts of a block sample, filled in while the sample is read.
+
+    The counts are complete once the sample iterator is exhausted.
+
+    Args:
+        sampled_bytes: Bytes of row data in the selected blocks
+        total_bytes: Bytes of row data in all files
+    """
+
+    sampled_bytes: int = 0
+    total_bytes: int = 0
+
+    @property
+    def complete(self) -> bool:
+        """Whether every block was selected."""
+        return self.sampled_bytes == self.total_bytes
+
+
+def parse_size(value: str) -> int:
+    """Parse a human-readable byte size such as ``512M`` or ``2G``.
+
+    Args:
+        value: Number of bytes with an optional K/M/G/T suffix (powers of 1024)
+
+    Returns:
+        Size in bytes
+
+    Raises:
+        ValueError: If the value is not a valid size
+    """
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([KMGT]?)i?B?\s*", value, re.IGNORECASE)
+    if match is None:
+        raise ValueError(f"Invalid size: '{value}'")
+    return int(float(match.group(1)) * _SIZE_UNITS[match.group(2).upper()])
 
 
 class SerializeCSV:
@@ -14,30 +70,279 @@ class SerializeCSV:
 
     This class provides methods to read multiple CSV files and serialize
     their content into a unified list of dictionaries for further processing.
+    Every entry of ``file_names`` may be a plain file name, a directory
+    (all ``*.csv`` files inside it are read) or a glob pattern; relative
+    entries are resolved against ``data_root``. With ``dedupe`` every read
+    keeps only the first row for each key across all files. With
+    ``confine`` every path, including glob matches and files found in
+    directories, must resolve to a location inside ``data_root``.
 
     Args:
-        file_names: Tuple of CSV file names to process
+        file_names: Tuple of CSV file names, directories or glob patterns to process
+        data_root: Directory relative entries are resolved against
+        dedupe: Settings for dropping duplicate rows, disabled by default
+        confine: Reject paths that resolve outside ``data_root``
     """
 
-    def __init__(self, file_names: tuple[str, ...]) -> None:
+    def __init__(
+        self,
+        file_names: tuple[str, ...],
+        data_root: str = DEFAULT_DATA_ROOT,
+        dedupe: DedupeOptions | None = None,
+        confine: bool = False,
+    ) -> None:
         self.file_names: tuple[str, ...] = file_names
+        self.data_root: str = data_root
+        self.dedupe: DedupeOptions | None = dedupe
+        self.confine: bool = confine
         self.full_data: list[dict] = []
 
-    def get_full_data_from_files(self) -> list[dict]:
+    def iter_file_paths(self) -> Iterator[str]:
+        """Lazily enumerate the CSV file paths behind ``file_names``.
+
+        Glob patterns are expanded with ``glob.iglob``, so their paths are
+        yielded as soon as they are found instead of after the whole input
+        set has been listed. Directories are listed the same way with
+        ``os.scandir``. Files behind one pattern or directory come in the
+        order the file system lists them.
+
+        Yields:
+            Path of every CSV file to read, entries in input order
+
+        Raises:
+            FileNotFoundError: If a file doesn't exist, or a pattern or
+                directory matches no CSV files
+            PermissionError: If ``confine`` is set and a path resolves
+                outside ``data_root``
+        """
+        for file_name in self.file_names:
+            path = os.path.join(self.data_root, file_name)
+            if _is_pattern(file_name):
+                matched = False
+                for match in glob.iglob(path, recursive=True):
+                    if os.path.isfile(match):
+                        matched = True
+                        yield self._check_confined(match)
+                if not matched:
+                    raise FileNotFoundError(f"No files match pattern: '{path}'")
+            elif os.path.isdir(path):
+                self._check_confined(path)
+                matched = False
+                with os.scandir(path) as entries:
+                    for entry in entries:
+                        if entry.name.endswith(".csv") and entry.is_file():
+                            matched = True
+                            yield self._check_confined(entry.path)
+                if not matched:
+                    raise FileNotFoundError(f"No CSV files in directory: '{path}'")
+            else:
+                yield self._check_confined(path)
+
+    def _check_confined(self, path: str) -> str:
+        # Symlinks and ".." are resolved first, so neither can leave the data root
+        if self.confine:
+            root = os.path.realpath(self.data_root)
+            if os.path.commonpath([root, os.path.realpath(path)]) != root:
+                raise PermissionError(f"Path outside data root: '{path}'")
+        return path
+
+    def iter_rows(self, columns: Sequence[str] | None = None) -> Iterator[dict]:
+        """Stream rows from all input files one at a time.
+
+        Files are opened as they are enumerated, so consumers can start
+        processing the first rows before the remaining inputs are listed.
+        Nothing is stored on the instance. With ``columns`` only those
+        columns (plus any de-duplication key columns) are extracted from
+        each line.
+
+        Args:
+            columns: Columns to read, all columns if None
+
+        Yields:
+            Dictionary for every CSV row, in file order
+
+        Raises:
+            FileNotFoundError: If any of the specified files doesn't exist
+            ValueError: If a file lacks one of the requested columns
+        """
+        if columns is not None and self.dedupe is not None:
+            columns = tuple(dict.fromkeys((*columns, *self.dedupe.columns)))
+        yield from self._dedupe(self._read_rows(columns))
+
+    def _read_rows(self, columns: Sequence[str] | None = None) -> Iterator[dict]:
+        for path in self.iter_file_paths():
+            with open(path) as csvfile:
+                if columns is None:
+                    yield from csv.DictReader(csvfile)
+                    continue
+                reader = csv.reader(csvfile)
+                header = next(reader, None)
+                if header is None:
+                    continue
+                missing = [column for column in columns if column not in header]
+                if missing:
+                    raise ValueError(f"Columns {missing} not found in '{path}'")
+                indexes = [(column, header.index(column)) for column in columns]
+                width = max((index for _, index in indexes), default=-1) + 1
+                for values in reader:
+                    if not values:
+                        continue
+                    if len(values) >= width:
+                        yield {column: values[index] for column, index in indexes}
+                    else:
+                        # Missing fields of short rows are None, as in csv.DictReader
+                        yield {column: values[index] if index < len(values) else None for column, index in indexes}
+
+    def _dedupe(self, rows: Iterator[dict]) -> Iterator[dict]:
+        if self.dedupe is None:
+            return rows
+        return Deduplicator(self.dedupe).filter(rows)
+
+    def iter_sampled_rows(
+        self, rate: float, block_size: int = DEFAULT_BLOCK_SIZE, seed: int | None = None
+    ) -> Iterator[dict]:
+        """Stream a block sample of the rows from all input files.
+
+        Every file is split into blocks of ``block_size`` bytes and each block
+        is kept with probability ``rate``; skipped blocks are never read. A row
+        belongs to the block its first byte falls into, so every row has the
+        same chance to be sampled. Fields with embedded line breaks are not
+        supported in this mode.
+
+        Args:
+            rate: Fraction of blocks to read, between 0 and 1
+            block_size: Size of a sampling block in bytes
+            seed: Seed for the random block selection
+
+        Yields:
+            Dictionary for every sampled CSV row, in file order
+
+        Raises:
+            ValueError: If ``rate`` is not in the (0, 1] range
+            FileNotFoundError: If any of the specified files doesn't exist
+        """
+        for block in self.iter_sampled_blocks(rate, block_size, seed):
+            yield from block
+
+    def iter_sampled_blocks(
+        self,
+        rate: float,
+        block_size: int = DEFAULT_BLOCK_SIZE,
+        seed: int | None = None,
+        stats: SampleStats | None = None,
+    ) -> Iterator[list[dict]]:
+        """Stream a block sample grouped by the block the rows were read from.
+
+        Selects the same blocks as ``iter_sampled_rows`` with the same seed.
+        Every selected block is yielded, even if it holds no complete row,
+        so the number of sampled blocks is known to the consumer. With
+        ``stats`` the sampled and total bytes are added up while reading,
+        e.g. to scale the sampled row count up to the whole input.
+
+        Args:
+            rate: Fraction of blocks to read, between 0 and 1
+            block_size: Size of a sampling block in bytes
+            seed: Seed for the random block selection
+            stats: Byte counts to add to
+
+        Yields:
+            List of the sampled rows of every selected block, in file order
+
+        Raises:
+            ValueError: If ``rate`` is not in the (0, 1] range
+            FileNotFoundError: If any of the specified files doesn't exist
+        """
+        if not 0 < rate <= 1:
+            raise ValueError(f"Sample rate must be in (0, 1], got {rate}")
+        deduplicator = Deduplicator(self.dedupe) if self.dedupe is not None else None
+        stats = stats if stats is not None else SampleStats()
+        for block in self._read_sampled_blocks(rate, block_size, seed, stats):
+            yield block if deduplicator is None else list(deduplicator.filter(block))
+
+    def _read_sampled_blocks(
+        self, rate: float, block_size: int, seed: int | None, stats: SampleStats
+    ) -> Iterator[list[dict]]:
+        rng = random.Random(seed)
+        for path in self.iter_file_paths():
+            with open(path, "rb") as csvfile:
+                header = next(csv.reader([csvfile.readline().decode()]), None)
+                if header is None:
+                    continue
+                data_start = csvfile.tell()
+                size = os.fstat(csvfile.fileno()).st_size
+                stats.total_bytes += size - data_start
+                for block_start in range(data_start, size, block_size):
+                    if rng.random() >= rate:
+                        continue
+                    block_end = min(block_start + block_size, size)
+                    stats.sampled_bytes += block_end - block_start
+                    lines = self._read_block(csvfile, block_start, block_end, data_start)
+                    yield [dict(zip(header, values, strict=False)) for values in csv.reader(lines) if values]
+
+    @staticmethod
+    def _read_block(csvfile, block_start: int, block_end: int, data_start: int) -> list[str]:
+        csvfile.seek(block_start - 1 if block_start > data_start else block_start)
+        if block_start > data_start and csvfile.read(1) != b"\n":
+            # The line started in the previous block
+            csvfile.readline()
+        lines = []
+        while csvfile.tell() < block_end:
+            line = csvfile.readline()
+            if not line:
+                break
+            lines.append(line.decode())
+        return lines
+
+    def get_full_data_from_files(
+        self, compact: bool = False, numeric_columns: Iterable[str] = (), encoded_columns: Iterable[str] = ()
+    ) -> list[dict] | ColumnarRows:
         """Read and serialize data from CSV files.
 
         Reads all specified CSV files and combines their data into a single
         list of dictionaries. Each dictionary represents one row from the CSV.
+        Every call reads the files again and replaces ``full_data`` with a
+        new list, so repeated calls return the same rows. With ``compact``
+        the data is returned as a new ``ColumnarRows`` table instead, which
+        stores columns rather than one dictionary per row and needs a
+        fraction of the memory.
+
+        Args:
+            compact: Return a ``ColumnarRows`` table instead of dictionaries
+            numeric_columns: Columns stored as floats in a compact table
+            encoded_columns: Low-cardinality columns dictionary-encoded in a compact table
 
         Returns:
-            List of dictionaries containing all data from CSV files
+            List of dictionaries or compact table containing all data from CSV files
 
         Raises:
             FileNotFoundError: If any of the specified files doesn't exist
+            ValueError: If compact files have different columns
         """
-        for file_name in self.file_names:
-            with open(f"data/{file_name}") as csvfile:
-                data = list(csv.DictReader(csvfile))
-                self.full_data.extend(data)
-
+        if compact:
+            return self._get_compact_data_from_files(tuple(numeric_columns), tuple(encoded_columns))
+        self.full_data = list(self.iter_rows())
         return self.full_data
+
+    def _get_compact_data_from_files(
+        self, numeric_columns: tuple[str, ...], encoded_columns: tuple[str, ...]
+    ) -> ColumnarRows:
+        table = None
+        deduplicator = Deduplicator(self.dedupe) if self.dedupe is not None else None
+        for path in self.iter_file_paths():
+            with open(path) as csvfile:
+                reader = csv.reader(csvfile)
+                header = next(reader, None)
+                if header is None:
+                    continue
+                if table is None:
+                    table = ColumnarRows(header, numeric_columns, encoded_columns)
+                if deduplicator is not None:
+                    missing = [column for column in self.dedupe.columns if column not in header]
+                    if missing:
+                        raise ValueError(f"Columns {missing} not found in '{path}'")
+                    key_indexes = [header.index(column) for column in self.dedupe.columns]
+                    reader = (
+                        values for values in reader if values and deduplicator.is_new([values[i] for i in key_indexes])
+                    )
+                table.extend(header, reader)
+        return table if table is not None else ColumnarRows((), numeric_columns, encoded_columns)
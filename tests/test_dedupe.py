@@ -0,0 +1,147 @@
+"""Unit tests for dedupe.py"""
+
+from __future__ import annotations
+
+import pytest
+
+from src.dedupe import BloomFilter, DedupeOptions, Deduplicator, FingerprintSet, fingerprint
+from src.report_factory import ReportFactory
+from src.utils import SerializeCSV
+
+
+class TestFingerprint:
+    """Tests for key fingerprints"""
+
+    def test_stable_and_distinct(self) -> None:
+        """Test that fingerprints are deterministic and separate key parts"""
+        assert fingerprint(["iphone se", "apple"]) == fingerprint(["iphone se", "apple"])
+        assert fingerprint(["iphone se", "apple"]) != fingerprint(["iphone", "se apple"])
+        assert 0 < fingerprint(["iphone se", "apple"]) < 2**64
+
+
+class TestFingerprintSet:
+    """Tests for the open-addressing fingerprint table"""
+
+    def test_add_and_grow(self) -> None:
+        """Test inserting more keys than the initial capacity"""
+        table = FingerprintSet(max_bytes=1 << 20, initial_capacity=4)
+
+        assert all(table.add(key) for key in range(1, 1001))
+        assert not table.add(500)
+        assert len(table) == 1000
+        assert 999 in table
+        assert 1001 not in table
+        assert table.nbytes <= 2 * 8 * 2048
+
+    def test_memory_limit(self) -> None:
+        """Test that the table refuses to grow past its memory limit"""
+        table = FingerprintSet(max_bytes=8 * 64, initial_capacity=64)
+
+        with pytest.raises(MemoryError):
+            for key in range(1, 100):
+                table.add(key)
+        assert len(table) == 32
+
+    def test_memory_limit_includes_growth(self) -> None:
+        """Test that the old table counts towards the limit while growing"""
+        # Growing from 64 to 128 slots needs 512 + 1024 bytes at once
+        table = FingerprintSet(max_bytes=8 * 128, initial_capacity=64)
+
+        with pytest.raises(MemoryError):
+            for key in range(1, 100):
+                table.add(key)
+        assert table.nbytes == 8 * 64
+
+        table = FingerprintSet(max_bytes=8 * 192, initial_capacity=64)
+        for key in range(1, 65):
+            table.add(key)
+        assert table.nbytes == 8 * 128
+
+
+class TestBloomFilter:
+    """Tests for BloomFilter"""
+
+    def test_no_false_negatives(self) -> None:
+        """Test that inserted keys are always found"""
+        bloom = BloomFilter(1024)
+        keys = [fingerprint([str(i)]) for i in range(200)]
+
+        assert all(bloom.add(key) for key in keys)
+        assert all(key in bloom for key in keys)
+        assert not bloom.add(keys[0])
+
+
+class TestDeduplicator:
+    """Tests for Deduplicator"""
+
+    def test_filter_duplicates(self, sample_product_data: list[dict[str, str]]) -> None:
+        """Test that only the first row per key is kept"""
+        rows = sample_product_data + [dict(sample_product_data[0], price="1")]
+        deduplicator = Deduplicator(DedupeOptions(("name", "brand")))
+
+        result = list(deduplicator.filter(rows))
+
+        assert result == sample_product_data
+
+    def test_memory_limit_without_bloom(self) -> None:
+        """Test that a full table raises MemoryError without a Bloom filter"""
+        deduplicator = Deduplicator(DedupeOptions(("name",), memory_limit=8 * 1024))
+
+        with pytest.raises(MemoryError):
+            for i in range(1000):
+                deduplicator.is_new([str(i)])
+
+    def test_memory_limit_with_bloom(self) -> None:
+        """Test that a Bloom filter takes over when the table is full"""
+        deduplicator = Deduplicator(DedupeOptions(("name",), memory_limit=64 * 1024, bloom=True))
+
+        new = sum(deduplicator.is_new([str(i)]) for i in range(5000))
+        repeated = sum(deduplicator.is_new([str(i)]) for i in range(5000))
+
+        assert deduplicator.overflow is not None
+        assert repeated == 0
+        # Only Bloom filter false positives may be lost
+        assert new >= 4990
+
+
+class TestSerializeCSVDedupe:
+    """Tests for de-duplication while reading files"""
+
+    def test_dedupe_across_files(self, temp_csv_files: dict[str, str]) -> None:
+        """Test that overlapping files yield each product once"""
+        files = (temp_csv_files["file1"], temp_csv_files["file2"], temp_csv_files["file1"])
+        serializer = SerializeCSV(files, temp_csv_files["data_dir"], DedupeOptions(("name", "brand")))
+
+        assert len(list(serializer.iter_rows())) == 6
+        # Every scan starts with an empty fingerprint table
+        assert len(list(serializer.iter_rows())) == 6
+        assert len(serializer.get_full_data_from_files()) == 6
+        assert len(serializer.get_full_data_from_files(compact=True)) == 6
+        assert len(list(serializer.iter_sampled_rows(1.0))) == 6
+
+    def test_report_with_dedupe(self, temp_csv_files: dict[str, str]) -> None:
+        """Test that duplicates don't distort report averages"""
+        files = (temp_csv_files["file1"], temp_csv_files["file1"], temp_csv_files["file2"])
+        result = ReportFactory.get_report(
+            files, ("brand", "rating"), temp_csv_files["data_dir"], dedupe=DedupeOptions(("name", "brand"))
+        )
+
+        assert result == ReportFactory.get_report(
+            (temp_csv_files["file1"], temp_csv_files["file2"]), ("brand", "rating"), temp_csv_files["data_dir"]
+        )
+
+    def test_compact_dedupe_blank_lines(self, tmp_path) -> None:
+        """Test that blank lines are skipped before compact rows are fingerprinted"""
+        (tmp_path / "blank.csv").write_text("name,brand,rating\nx,apple,4.5\n\nx,apple,4.5\ny,xiaomi,4.1\n")
+        serializer = SerializeCSV(("blank.csv",), str(tmp_path), DedupeOptions(("name", "brand")))
+
+        result = serializer.get_full_data_from_files(compact=True)
+
+        assert [row["brand"] for row in result] == ["apple", "xiaomi"]
+
+    def test_compact_dedupe_missing_column(self, temp_csv_files: dict[str, str]) -> None:
+        """Test that a missing de-duplication column names the file"""
+        serializer = SerializeCSV((temp_csv_files["file1"],), temp_csv_files["data_dir"], DedupeOptions(("sku",)))
+
+        with pytest.raises(ValueError, match=r"Columns \['sku'\] not found in '.*test_products1.csv'"):
+            serializer.get_full_data_from_files(compact=True)
@@ -0,0 +1,321 @@
+"""Integration tests for distributed.py"""
+
+from __future__ import annotations
+
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections.abc import Iterator
+
+import pytest
+
+from src import distributed
+from src.distributed import ReportCoordinator, ReportWorker, WorkerError, parse_address
+from src.report_factory import ReportFactory
+from src.reports import BrandReports
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def start_worker() -> Iterator:
+    """Starts ReportWorker servers in background threads"""
+    workers = []
+
+    def start(data_root: str) -> tuple[str, int]:
+        worker = ReportWorker(("127.0.0.1", 0), data_root)
+        threading.Thread(target=worker.serve_forever, args=(0.05,), daemon=True).start()
+        workers.append(worker)
+        return worker.server_address[:2]
+
+    yield start
+
+    for worker in workers:
+        worker.shutdown()
+        worker.server_close()
+
+
+@pytest.fixture
+def silent_server() -> Iterator[tuple[str, int]]:
+    """Server that accepts connections but never answers"""
+    server = socket.create_server(("127.0.0.1", 0))
+    connections = []
+    stop = threading.Event()
+
+    def accept() -> None:
+        while not stop.is_set():
+            try:
+                connections.append(server.accept()[0])
+            except OSError:
+                return
+
+    threading.Thread(target=accept, daemon=True).start()
+    yield server.getsockname()[:2]
+
+    stop.set()
+    server.close()
+    for connection in connections:
+        connection.close()
+
+
+def closed_port() -> tuple[str, int]:
+    """Address nothing listens on"""
+    with socket.create_server(("127.0.0.1", 0)) as server:
+        return server.getsockname()[:2]
+
+
+class TestReportCoordinator:
+    """Tests for dispatching work to workers"""
+
+    def test_aggregate_across_workers(
+        self, start_worker, temp_csv_files: dict[str, str], sample_product_data: list[dict[str, str]]
+    ) -> None:
+        """Test that partial results of several workers merge into the full result"""
+        workers = [start_worker(temp_csv_files["data_dir"]) for _ in range(3)]
+        coordinator = ReportCoordinator(workers)
+
+        result = coordinator.aggregate([temp_csv_files["file1"], temp_csv_files["file2"]], ("brand", "rating"))
+
+        expected = BrandReports.aggregate(sample_product_data, ("brand", "rating"))
+        assert sorted(result.results()) == sorted(expected.results())
+
+    def test_aggregate_distinct_across_workers(
+        self, start_worker, temp_csv_files: dict[str, str], sample_product_data: list[dict[str, str]]
+    ) -> None:
+        """Test that distinct sketches are sent back and merged"""
+        workers = [start_worker(temp_csv_files["data_dir"]) for _ in range(2)]
+        coordinator = ReportCoordinator(workers, precision=8)
+        files = [temp_csv_files["file1"], temp_csv_files["file2"], temp_csv_files["file1"]]
+
+        result = coordinator.aggregate(files, ("brand", "rating"), distinct_column="name")
+
+        assert {item.group: item.distinct for item in result.results()} == {"apple": 2, "samsung": 2, "xiaomi": 2}
+        assert result.groups["apple"].count == 3
+
+    def test_skips_dead_worker(
+        self, start_worker, temp_csv_files: dict[str, str], sample_product_data: list[dict[str, str]]
+    ) -> None:
+        """Test that an unreachable worker is left out of the listing and the tasks"""
+        workers = [closed_port(), start_worker(temp_csv_files["data_dir"])]
+        coordinator = ReportCoordinator(workers, timeout=5)
+
+        result = coordinator.aggregate([temp_csv_files["file1"], temp_csv_files["file2"]], ("brand", "rating"))
+
+        assert result.rows() == BrandReports.aggregate(sample_product_data, ("brand", "rating")).rows()
+
+    def test_retry_on_replica(
+        self,
+        start_worker,
+        temp_csv_files: dict[str, str],
+        sample_product_data: list[dict[str, str]],
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        """Test that tasks of a worker that dies after the listing are re-sent to a replica"""
+        workers = [start_worker(temp_csv_files["data_dir"]) for _ in range(2)]
+        request = ReportCoordinator._request
+
+        def fail_tasks(self, worker: tuple[str, int], message: dict) -> dict:
+            if worker == workers[0] and "files" in message:
+                raise ConnectionRefusedError("Connection refused")
+            return request(self, worker, message)
+
+        monkeypatch.setattr(ReportCoordinator, "_request", fail_tasks)
+        coordinator = ReportCoordinator(workers, retries=1)
+
+        result = coordinator.aggregate([temp_csv_files["file1"], temp_csv_files["file2"]], ("brand", "rating"))
+
+        assert result.rows() == BrandReports.aggregate(sample_product_data, ("brand", "rating")).rows()
+        assert coordinator._failed == {workers[0]}
+
+    def test_files_on_different_workers(self, start_worker, tmp_path, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test that every worker lists its own files and only gets tasks for files it has"""
+        for name, brand in (("a", "apple"), ("b", "xiaomi")):
+            (tmp_path / name).mkdir()
+            (tmp_path / name / f"{name}.csv").write_text(f"brand,rating\n{brand},4.5\n")
+        workers = [start_worker(str(tmp_path / name)) for name in ("a", "b")]
+        tasks = []
+        request = ReportCoordinator._request
+        monkeypatch.setattr(
+            ReportCoordinator,
+            "_request",
+            lambda self, worker, message: (
+                ("files" in message and tasks.append((worker, message["files"]))) or request(self, worker, message)
+            ),
+        )
+        coordinator = ReportCoordinator(workers)
+
+        assert coordinator.list_files(["*.csv"]) == [("a.csv", (workers[0],)), ("b.csv", (workers[1],))]
+        result = coordinator.aggregate(["*.csv"], ("brand", "rating"))
+
+        assert set(result.groups) == {"apple", "xiaomi"}
+        assert sorted(tasks) == sorted([(workers[0], ["a.csv"]), (workers[1], ["b.csv"])])
+
+    def test_missing_on_every_worker(self, start_worker, temp_csv_files: dict[str, str]) -> None:
+        """Test that an entry no worker has files for raises FileNotFoundError"""
+        coordinator = ReportCoordinator([start_worker(temp_csv_files["data_dir"]) for _ in range(2)])
+
+        with pytest.raises(FileNotFoundError, match=r"\['nonexistent.csv', 'none\*.csv'\]"):
+            coordinator.aggregate([temp_csv_files["file1"], "nonexistent.csv", "none*.csv"], ("brand", "rating"))
+
+    def test_retry_on_slow_worker(self, start_worker, silent_server, temp_csv_files: dict[str, str]) -> None:
+        """Test that tasks of a worker that sends neither heartbeats nor an answer are re-sent"""
+        coordinator = ReportCoordinator([silent_server, start_worker(temp_csv_files["data_dir"])], timeout=0.5)
+
+        result = coordinator.aggregate([temp_csv_files["file1"]], ("brand", "rating"))
+
+        assert result.groups["apple"].count == 1
+
+    def test_waits_for_busy_worker(
+        self, start_worker, temp_csv_files: dict[str, str], monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Test that a task running longer than the timeout isn't retried while the worker sends heartbeats"""
+        aggregate = BrandReports.aggregate
+        calls = []
+
+        def slow_aggregate(*args: object) -> object:
+            calls.append(args)
+            time.sleep(1.0)
+            return aggregate(*args)
+
+        monkeypatch.setattr(distributed.BrandReports, "aggregate", slow_aggregate)
+        coordinator = ReportCoordinator([start_worker(temp_csv_files["data_dir"])], timeout=0.3)
+
+        result = coordinator.aggregate([temp_csv_files["file1"]], ("brand", "rating"))
+
+        assert result.groups["apple"].count == 1
+        assert len(calls) == 1
+        assert coordinator._failed == set()
+
+    def test_task_fails_everywhere(self, start_worker, temp_csv_files: dict[str, str]) -> None:
+        """Test that a task failing on every attempt raises WorkerError"""
+        coordinator = ReportCoordinator([start_worker(temp_csv_files["data_dir"])], retries=1)
+
+        with pytest.raises(WorkerError, match="ValueError"):
+            coordinator.aggregate([temp_csv_files["file1"]], ("brand", "nonexistent"))
+
+    def test_entries_are_split_into_files(
+        self, start_worker, temp_csv_files: dict[str, str], monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Test that the files behind one glob or directory are spread over several tasks"""
+        messages = []
+        request = ReportCoordinator._request
+        monkeypatch.setattr(
+            ReportCoordinator,
+            "_request",
+            lambda self, worker, message: messages.append(message) or request(self, worker, message),
+        )
+        coordinator = ReportCoordinator([start_worker(temp_csv_files["data_dir"]) for _ in range(2)])
+
+        result = coordinator.aggregate(["test_products*.csv"], ("brand", "rating"))
+
+        tasks = sorted(message["files"] for message in messages if "files" in message)
+        assert sum("list" in message for message in messages) == 2
+        assert tasks == [[temp_csv_files["file1"]], [temp_csv_files["file2"]]]
+        assert sum(state.count for state in result.groups.values()) == 6
+
+    def test_list_files(self, start_worker, temp_csv_files: dict[str, str]) -> None:
+        """Test that a worker expands directories and patterns relative to its data root"""
+        open(os.path.join(temp_csv_files["data_dir"], "odd[1].csv"), "w").close()
+        coordinator = ReportCoordinator([start_worker(temp_csv_files["dir"])])
+
+        files = coordinator.list_files(["data", "data/test_products?.csv"])
+
+        files = [remote_file.name for remote_file in files]
+        # Files behind one entry come in file system order
+        assert sorted(files[:3]) == ["data/odd[[]1].csv", "data/test_products1.csv", "data/test_products2.csv"]
+        assert sorted(files[3:]) == ["data/test_products1.csv", "data/test_products2.csv"]
+
+    def test_worker_errors_dont_mark_worker_failed(self, start_worker, temp_csv_files: dict[str, str]) -> None:
+        """Test that only unreachable or slow workers are skipped for later tasks"""
+        healthy = start_worker(temp_csv_files["data_dir"])
+        dead = closed_port()
+        coordinator = ReportCoordinator([healthy, dead], timeout=5, retries=1)
+
+        with pytest.raises(WorkerError, match="ValueError"):
+            coordinator.aggregate([temp_csv_files["file1"]], ("brand", "nonexistent"))
+
+        assert coordinator._failed == {dead}
+
+    @pytest.mark.parametrize("file_name", ["../outside.csv", "../*.csv", "{outside}"])
+    def test_worker_rejects_paths_outside_data_root(
+        self, start_worker, temp_csv_files: dict[str, str], file_name: str
+    ) -> None:
+        """Test that a worker refuses to read files outside its data root"""
+        outside = os.path.join(temp_csv_files["dir"], "outside.csv")
+        with open(outside, "w") as f:
+            f.write("brand,rating\nsecret,5\n")
+        coordinator = ReportCoordinator([start_worker(temp_csv_files["data_dir"])], retries=0)
+
+        with pytest.raises(WorkerError, match="PermissionError"):
+            coordinator.aggregate([file_name.format(outside=outside)], ("brand", "rating"))
+
+    def test_requires_workers(self) -> None:
+        """Test that a coordinator needs at least one worker"""
+        with pytest.raises(ValueError):
+            ReportCoordinator([])
+
+    def test_report_factory_with_workers(self, start_worker, temp_csv_files: dict[str, str]) -> None:
+        """Test distributed report table through ReportFactory"""
+        files = (temp_csv_files["file1"], temp_csv_files["file2"])
+        workers = [start_worker(temp_csv_files["data_dir"]) for _ in range(2)]
+
+        result = ReportFactory.get_report(files, ("brand", "price"), workers=workers)
+
+        assert "1099" in result  # Samsung: (1199 + 999) / 2
+        with pytest.raises(ValueError):
+            ReportFactory.get_report(files, ("brand", "price"), workers=workers, sample=0.5)
+
+
+class TestWorkerProcesses:
+    """End-to-end test with worker processes started from main.py"""
+
+    def test_coordinator_with_worker_processes(self, temp_csv_files: dict[str, str]) -> None:
+        """Test a report distributed over two worker processes"""
+        processes = []
+        try:
+            addresses = []
+            for _ in range(2):
+                process = subprocess.Popen(
+                    [sys.executable, "main.py", "--serve", "127.0.0.1:0", "--data-root", temp_csv_files["data_dir"]],
+                    cwd=PROJECT_ROOT,
+                    stdout=subprocess.PIPE,
+                    text=True,
+                )
+                processes.append(process)
+                addresses.append(parse_address(process.stdout.readline().split()[-1]))
+
+            result = subprocess.run(
+                [sys.executable, "main.py", "--report", "average-rating", "--workers"]
+                + [f"{host}:{port}" for host, port in addresses]
+                + ["--files", temp_csv_files["file1"], temp_csv_files["file2"]],
+                cwd=PROJECT_ROOT,
+                capture_output=True,
+                text=True,
+                timeout=30,
+                check=True,
+            )
+
+            assert "samsung" in result.stdout
+            assert "4.7" in result.stdout
+        finally:
+            for process in processes:
+                process.terminate()
+                process.wait()
+                process.stdout.close()
+
+
+class TestParseAddress:
+    """Tests for parse_address"""
+
+    def test_valid_address(self) -> None:
+        """Test parsing host and port"""
+        assert parse_address("127.0.0.1:9000") == ("127.0.0.1", 9000)
+
+    @pytest.mark.parametrize("value", ["localhost", ":9000", "localhost:port"])
+    def test_invalid_address(self, value: str) -> None:
+        """Test that malformed addresses are rejected"""
+        with pytest.raises(ValueError):
+            parse_address(value)
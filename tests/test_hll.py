@@ -0,0 +1,66 @@
+"""Unit tests for hll.py"""
+
+from __future__ import annotations
+
+import pytest
+
+from src.hll import HyperLogLog
+
+
+class TestHyperLogLog:
+    """Tests for HyperLogLog sketches"""
+
+    def test_small_counts_are_exact(self) -> None:
+        """Test that small cardinalities are counted almost exactly"""
+        sketch = HyperLogLog()
+        for i in range(50):
+            sketch.add(f"product {i % 10}")
+
+        assert sketch.estimate() == 10
+        assert HyperLogLog().estimate() == 0
+
+    @pytest.mark.parametrize("precision", [10, 12, 14])
+    def test_large_count_error(self, precision: int) -> None:
+        """Test the estimate stays within a few standard errors"""
+        sketch = HyperLogLog(precision)
+        for i in range(50_000):
+            sketch.add(f"product {i}")
+
+        standard_error = 1.04 / (2**precision) ** 0.5
+        assert abs(sketch.estimate() - 50_000) / 50_000 < 4 * standard_error
+
+    def test_merge(self) -> None:
+        """Test that merged sketches count the union of their inputs"""
+        first, second, union = HyperLogLog(), HyperLogLog(), HyperLogLog()
+        for i in range(3000):
+            first.add(f"product {i}")
+            union.add(f"product {i}")
+        for i in range(2000, 5000):
+            second.add(f"product {i}")
+            union.add(f"product {i}")
+
+        merged = first + second
+
+        assert merged == union
+        # Operands are left untouched
+        assert first != union
+
+    def test_merge_different_precision(self) -> None:
+        """Test that sketches of different precision can't be merged"""
+        with pytest.raises(ValueError):
+            HyperLogLog(10) + HyperLogLog(12)
+
+    @pytest.mark.parametrize("precision", [3, 17])
+    def test_invalid_precision(self, precision: int) -> None:
+        """Test that precision outside the supported range is rejected"""
+        with pytest.raises(ValueError):
+            HyperLogLog(precision)
+
+    def test_registers_size(self) -> None:
+        """Test restoring a sketch from its registers"""
+        sketch = HyperLogLog(4)
+        sketch.add("apple")
+
+        assert HyperLogLog(4, bytes(sketch.registers)) == sketch
+        with pytest.raises(ValueError):
+            HyperLogLog(4, bytes(8))
@@ -0,0 +1,77 @@
+"""Unit tests for registry.py"""
+
+from __future__ import annotations
+
+import pytest
+
+from src.registry import REPORTS, ReportPlan, ReportSpec, get_report_specs, load_report_names, register_report
+from src.reports import BrandReports
+from src.utils import SerializeCSV
+
+
+class TestRegistry:
+    """Tests for registering and looking up reports"""
+
+    def test_builtin_reports(self) -> None:
+        """Test that the built-in reports declare their columns"""
+        assert REPORTS["average-rating"].columns == ("brand", "rating")
+        assert REPORTS["average-price"].columns == ("brand", "price")
+
+    def test_register_report(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test adding a new report type"""
+        monkeypatch.setattr("src.registry.REPORTS", dict(REPORTS))
+        spec = register_report(ReportSpec("average-rating-by-name", "name", "rating"))
+
+        assert get_report_specs(["average-rating-by-name"]) == [spec]
+        with pytest.raises(ValueError):
+            register_report(ReportSpec("average-rating-by-name", "name", "price"))
+
+    def test_get_report_specs(self) -> None:
+        """Test lookup order, repeated names and unknown names"""
+        specs = get_report_specs(["average-price", "average-rating", "average-price"])
+
+        assert [spec.name for spec in specs] == ["average-price", "average-rating"]
+        with pytest.raises(KeyError):
+            get_report_specs(["nonexistent"])
+
+    def test_load_report_names(self, tmp_path) -> None:
+        """Test reading report names from a TOML config"""
+        config = tmp_path / "reports.toml"
+        config.write_text('reports = ["average-rating", "average-price"]\n')
+
+        assert load_report_names(str(config)) == ["average-rating", "average-price"]
+
+    def test_load_invalid_config(self, tmp_path) -> None:
+        """Test that a config without a list of reports is rejected"""
+        config = tmp_path / "reports.toml"
+        config.write_text('reports = "average-rating"\n')
+
+        with pytest.raises(ValueError):
+            load_report_names(str(config))
+
+
+class TestReportPlan:
+    """Tests for shared-scan report plans"""
+
+    def test_column_union(self) -> None:
+        """Test that the plan reads the union of the needed columns"""
+        plan = ReportPlan(get_report_specs(["average-rating", "average-price"]))
+
+        assert plan.columns == ("brand", "rating", "price")
+
+    def test_single_scan(self, temp_csv_files: dict[str, str], sample_product_data: list[dict[str, str]]) -> None:
+        """Test that all reports are computed from one projected scan"""
+        serializer = SerializeCSV((temp_csv_files["file1"], temp_csv_files["file2"]), temp_csv_files["data_dir"])
+        scans = []
+        original_iter_rows = serializer.iter_rows
+
+        def iter_rows(columns=None):
+            scans.append(columns)
+            return original_iter_rows(columns)
+
+        serializer.iter_rows = iter_rows
+        results = ReportPlan(get_report_specs(["average-rating", "average-price"])).run(serializer)
+
+        assert scans == [("brand", "rating", "price")]
+        assert results["average-rating"] == BrandReports.aggregate(sample_product_data, ("brand", "rating"))
+        assert results["average-price"] == BrandReports.aggregate(sample_product_data, ("brand", "price"))
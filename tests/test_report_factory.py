@@ -241,3 +241,62 @@ macbook,apple,1999,5.0"""
 
         finally:
             os.chdir(original_cwd)
+
+    def test_get_report_with_data_root_and_glob(self, temp_csv_files: dict[str, str]) -> None:
+        """Test report generation from a glob pattern under a custom data root"""
+        result = ReportFactory.get_report(
+            files=("test_products*.csv",), columns=("brand", "rating"), data_root=temp_csv_files["data_dir"]
+        )
+
+        assert "apple" in result
+        assert "4.7" in result  # Samsung: (4.8 + 4.6) / 2
+
+
+class TestGetReports:
+    """Tests for ReportFactory.get_reports()"""
+
+    def test_single_report_by_name(self, temp_csv_files: dict[str, str]) -> None:
+        """Test that one report is returned as a bare table"""
+        files = (temp_csv_files["file1"], temp_csv_files["file2"])
+
+        result = ReportFactory.get_reports(files, ["average-rating"], temp_csv_files["data_dir"])
+
+        assert result == ReportFactory.get_report(files, ("brand", "rating"), temp_csv_files["data_dir"])
+
+    def test_several_reports(self, temp_csv_files: dict[str, str]) -> None:
+        """Test that several reports are titled and computed together"""
+        files = (temp_csv_files["file1"], temp_csv_files["file2"])
+
+        result = ReportFactory.get_reports(files, ["average-rating", "average-price"], temp_csv_files["data_dir"])
+
+        rating_table = ReportFactory.get_report(files, ("brand", "rating"), temp_csv_files["data_dir"])
+        price_table = ReportFactory.get_report(files, ("brand", "price"), temp_csv_files["data_dir"])
+        assert result == f"average-rating\n{rating_table}\n\naverage-price\n{price_table}"
+
+    def test_several_sampled_reports(self, temp_csv_files: dict[str, str]) -> None:
+        """Test that sampled reports run one report at a time"""
+        files = (temp_csv_files["file1"],)
+
+        result = ReportFactory.get_reports(
+            files, ["average-rating", "average-price"], temp_csv_files["data_dir"], sample=1.0
+        )
+
+        assert result.count("±95%") == 2
+
+    def test_distinct_products_report(self, temp_csv_files: dict[str, str]) -> None:
+        """Test the registered report with distinct product counts"""
+        files = (temp_csv_files["file1"], temp_csv_files["file2"])
+
+        result = ReportFactory.get_reports(files, ["distinct-products"], temp_csv_files["data_dir"], precision=8)
+
+        assert "distinct name" in result
+        assert result == ReportFactory.get_report(
+            files, ("brand", "rating"), temp_csv_files["data_dir"], distinct_column="name", precision=8
+        )
+        with pytest.raises(ValueError):
+            ReportFactory.get_reports(files, ["distinct-products"], temp_csv_files["data_dir"], sample=0.5)
+
+    def test_unknown_report(self, temp_csv_files: dict[str, str]) -> None:
+        """Test that unknown report names raise KeyError"""
+        with pytest.raises(KeyError):
+            ReportFactory.get_reports((temp_csv_files["file1"],), ["nonexistent"], temp_csv_files["data_dir"])
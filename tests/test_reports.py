@@ -2,7 +2,12 @@
 
 from __future__ import annotations
 
-from src.reports import BrandReports
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.reports import AvgAggregate, BrandReports, GroupedAverages, GroupResult
+from src.rows import ColumnarRows
 
 
 class TestBrandReportsInit:
@@ -75,6 +80,20 @@ class TestFilterByReportColumns:
 class TestGroupByAvg:
     """Tests for group_by_avg method"""
 
+    def test_repeated_calls(self, sample_product_data: list[dict[str, str]]) -> None:
+        """Test that repeated calls return fresh lists instead of accumulating"""
+        report = BrandReports(sample_product_data, ("brand", "rating"))
+        first_filtered = report.filter_by_report_columns()
+        first = report.group_by_avg()
+
+        assert report.filter_by_report_columns() == first_filtered
+        assert len(report.grouped_request_data) == 6
+        second = report.group_by_avg()
+        assert second == first
+        assert second is not first
+        assert report.values_data["apple"] == [4.9, 4.1]
+        assert report.get_avg_rating_report() == report.get_avg_rating_report()
+
     def test_group_by_brand_rating(self, sample_product_data: list[dict[str, str]]) -> None:
         """Test grouping by brand and calculating average rating"""
         report = BrandReports(sample_product_data, ("brand", "rating"))
@@ -236,3 +255,145 @@ class TestBrandReportsEdgeCases:
 
         # Should handle string to float conversion correctly
         assert result[0]["rating"] == 4.0  # (4.5 + 3.5) / 2 = 4.0
+
+
+class TestAggregate:
+    """Tests for the stateless BrandReports.aggregate API"""
+
+    def test_aggregate_brand_rating(
+        self, sample_product_data: list[dict[str, str]], expected_brand_rating_report: list[dict[str, str | float]]
+    ) -> None:
+        """Test aggregation returns the same averages as the legacy workflow"""
+        result = BrandReports.aggregate(sample_product_data, ("brand", "rating"))
+
+        assert isinstance(result, GroupedAverages)
+        assert result.groups["apple"] == AvgAggregate(9.0, 2)
+        assert sorted(result.rows(), key=lambda x: x["brand"]) == expected_brand_rating_report
+
+    def test_aggregate_is_repeatable(self, sample_product_data: list[dict[str, str]]) -> None:
+        """Test that repeated calls don't accumulate data"""
+        first = BrandReports.aggregate(sample_product_data, ("brand", "rating"))
+        second = BrandReports.aggregate(sample_product_data, ("brand", "rating"))
+
+        assert first == second
+        assert first.groups["samsung"].count == 2
+
+    def test_aggregate_accepts_iterator(self, sample_product_data: list[dict[str, str]]) -> None:
+        """Test aggregation over a one-shot iterator"""
+        result = BrandReports.aggregate(iter(sample_product_data), ("brand", "price"))
+
+        assert result.rows()[0] == {"brand": "samsung", "price": 1099.0}
+
+    def test_add_other_type(self, sample_product_data: list[dict[str, str]]) -> None:
+        """Test that adding anything but GroupedAverages raises TypeError"""
+        result = BrandReports.aggregate(sample_product_data, ("brand", "rating"))
+
+        with pytest.raises(TypeError):
+            result + {"apple": AvgAggregate(1.0, 1)}  # type: ignore[operator]
+        with pytest.raises(TypeError):
+            result + 1  # type: ignore[operator]
+        assert sum([result]) == result
+
+    def test_result_is_immutable(self, sample_product_data: list[dict[str, str]]) -> None:
+        """Test that results can't be modified in place"""
+        result = BrandReports.aggregate(sample_product_data, ("brand", "rating"))
+
+        with pytest.raises(TypeError):
+            result.groups["apple"] = AvgAggregate(1.0, 1)  # type: ignore[index]
+        with pytest.raises(AttributeError):
+            result.avg_column = "price"  # type: ignore[misc]
+
+    def test_merge_partial_results(self, sample_product_data: list[dict[str, str]]) -> None:
+        """Test that partial results combine with + into the full result"""
+        full = BrandReports.aggregate(sample_product_data, ("brand", "rating"))
+        first = BrandReports.aggregate(sample_product_data[:3], ("brand", "rating"))
+        second = BrandReports.aggregate(sample_product_data[3:], ("brand", "rating"))
+
+        merged = first + second
+        assert merged.rows() == full.rows()
+        # Operands are left untouched
+        assert first.groups["apple"] == AvgAggregate(4.9, 1)
+
+    def test_sum_of_partial_results(self, sample_product_data: list[dict[str, str]]) -> None:
+        """Test merging many partial results with the built-in sum()"""
+        partials = [BrandReports.aggregate([row], ("brand", "rating")) for row in sample_product_data]
+
+        assert sum(partials).rows() == BrandReports.aggregate(sample_product_data, ("brand", "rating")).rows()
+
+    def test_merge_different_columns(self, sample_product_data: list[dict[str, str]]) -> None:
+        """Test that results over different columns can't be merged"""
+        ratings = BrandReports.aggregate(sample_product_data, ("brand", "rating"))
+        prices = BrandReports.aggregate(sample_product_data, ("brand", "price"))
+
+        with pytest.raises(ValueError):
+            ratings + prices
+
+    def test_concurrent_aggregation(self, sample_product_data: list[dict[str, str]]) -> None:
+        """Test aggregating chunks in threads and merging the results"""
+        chunks = [sample_product_data[i : i + 2] for i in range(0, len(sample_product_data), 2)]
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            partials = list(executor.map(lambda chunk: BrandReports.aggregate(chunk, ("brand", "rating")), chunks))
+
+        assert sum(partials).groups == BrandReports.aggregate(sample_product_data, ("brand", "rating")).groups
+
+    def test_aggregate_many(self, sample_product_data: list[dict[str, str]]) -> None:
+        """Test computing several groupings in one pass"""
+        rows = iter(sample_product_data)
+
+        ratings, prices = BrandReports.aggregate_many(rows, [("brand", "rating"), ("brand", "price")])
+
+        assert ratings == BrandReports.aggregate(sample_product_data, ("brand", "rating"))
+        assert prices == BrandReports.aggregate(sample_product_data, ("brand", "price"))
+
+    def test_aggregate_distinct(self, sample_product_data: list[dict[str, str]]) -> None:
+        """Test counting distinct products per brand next to the average"""
+        rows = sample_product_data + [dict(sample_product_data[0], rating="4.1")]
+
+        result = BrandReports.aggregate(rows, ("brand", "rating"), distinct_column="name")
+
+        assert result.results()[0] == GroupResult("samsung", 4.7, 2, 2)
+        assert {item.group: item.distinct for item in result.results()} == {"apple": 2, "samsung": 2, "xiaomi": 2}
+        assert set(result.rows()[0]) == {"brand", "rating", "distinct name"}
+
+    def test_merge_distinct(self, sample_product_data: list[dict[str, str]]) -> None:
+        """Test that distinct sketches merge with the partial results"""
+        full = BrandReports.aggregate(sample_product_data, ("brand", "rating"), "name", precision=6)
+        first = BrandReports.aggregate(sample_product_data[:4], ("brand", "rating"), "name", precision=6)
+        second = BrandReports.aggregate(sample_product_data[2:], ("brand", "rating"), "name", precision=6)
+
+        merged = first + second
+
+        assert merged.sketches == full.sketches
+        assert merged.results()[-1].distinct == 2  # xiaomi rows overlap but count once
+        with pytest.raises(ValueError):
+            merged + BrandReports.aggregate(sample_product_data, ("brand", "rating"))
+
+    def test_results(self, sample_product_data: list[dict[str, str]]) -> None:
+        """Test slim result rows"""
+        result = BrandReports.aggregate(sample_product_data, ("brand", "rating")).results()
+
+        assert result[0] == GroupResult("samsung", 4.7, 2)
+        assert result[0].average == 4.7
+
+    def test_aggregate_columnar_rows(self, sample_product_data: list[dict[str, str]]) -> None:
+        """Test aggregating a compact table"""
+        header = ("brand", "rating")
+        table = ColumnarRows(header, numeric_columns=("rating",))
+        table.extend(header, ([row["brand"], row["rating"]] for row in sample_product_data))
+
+        result = BrandReports.aggregate(table, header)
+        assert result.rows() == BrandReports.aggregate(sample_product_data, header).rows()
+
+    def test_aggregate_encoded_group_column(self, sample_product_data: list[dict[str, str]]) -> None:
+        """Test aggregating over a dictionary-encoded group column"""
+        header = ("brand", "price")
+        table = ColumnarRows(header, encoded_columns=("brand",))
+        table.extend(header, ([row["brand"], row["price"]] for row in sample_product_data))
+
+        result = BrandReports.aggregate(table, header)
+        assert result.groups == BrandReports.aggregate(sample_product_data, header).groups
+        assert list(result.groups) == ["apple", "samsung", "xiaomi"]
+
+    def test_empty_table(self) -> None:
+        """Test that an empty result formats as an empty table"""
+        assert BrandReports.aggregate([], ("brand", "rating")).to_table() == ""
@@ -0,0 +1,110 @@
+"""Unit tests for rows.py"""
+
+from __future__ import annotations
+
+from array import array
+
+import pytest
+
+from src.rows import ColumnarRows, DictionaryColumn, Row
+
+HEADER = ["name", "brand", "price", "rating"]
+
+
+@pytest.fixture
+def table(sample_product_data: list[dict[str, str]]) -> ColumnarRows:
+    """Compact table built from the sample product data"""
+    result = ColumnarRows(HEADER, numeric_columns=("price", "rating"))
+    result.extend(HEADER, ([row[name] for name in HEADER] for row in sample_product_data))
+    return result
+
+
+class TestColumnarRows:
+    """Tests for ColumnarRows storage"""
+
+    def test_column_types(self, table: ColumnarRows) -> None:
+        """Test that numeric columns are array-backed and others are lists"""
+        assert isinstance(table.columns["rating"], array)
+        assert isinstance(table.columns["price"], array)
+        assert table.columns["brand"] == ["apple", "samsung", "xiaomi", "xiaomi", "apple", "samsung"]
+        assert len(table) == 6
+
+    def test_row_view(self, table: ColumnarRows) -> None:
+        """Test that rows behave like read-only dictionaries"""
+        row = table[0]
+
+        assert isinstance(row, Row)
+        assert row == {"name": "iphone 15 pro", "brand": "apple", "price": 999.0, "rating": 4.9}
+        assert list(row.keys()) == HEADER
+        assert table[-1]["name"] == "galaxy z flip 5"
+        assert not hasattr(row, "__dict__")
+
+    def test_index_out_of_range(self, table: ColumnarRows) -> None:
+        """Test that out of range rows raise IndexError"""
+        with pytest.raises(IndexError):
+            table[6]
+
+    def test_iteration(self, table: ColumnarRows) -> None:
+        """Test iterating over all rows"""
+        assert [row["brand"] for row in table][:3] == ["apple", "samsung", "xiaomi"]
+
+    def test_extend_with_reordered_header(self) -> None:
+        """Test appending a file whose columns come in another order"""
+        result = ColumnarRows(("brand", "rating"), numeric_columns=("rating",))
+        result.extend(("rating", "brand"), [("4.5", "apple")])
+
+        assert result[0] == {"brand": "apple", "rating": 4.5}
+
+    def test_extend_with_different_columns(self) -> None:
+        """Test that files with other columns are rejected"""
+        result = ColumnarRows(("brand", "rating"))
+
+        with pytest.raises(ValueError):
+            result.extend(("brand", "price"), [("apple", "999")])
+
+    def test_extend_skips_empty_records(self) -> None:
+        """Test that blank lines are skipped like csv.DictReader does"""
+        result = ColumnarRows(("brand", "rating"), numeric_columns=("rating",))
+        result.extend(("rating", "brand"), [("4.5", "apple"), (), ("4.1", "xiaomi")])
+
+        assert len(result) == 2
+        assert result[1] == {"brand": "xiaomi", "rating": 4.1}
+
+    def test_failed_append_leaves_table_unchanged(self) -> None:
+        """Test that a bad row doesn't leave the columns ragged"""
+        result = ColumnarRows(("brand", "rating"), numeric_columns=("rating",), encoded_columns=("brand",))
+        result.append(("apple", "4.5"))
+
+        with pytest.raises(ValueError):
+            result.append(("samsung", "n/a"))
+        with pytest.raises(ValueError):
+            result.append(("samsung",))
+
+        assert len(result) == 1
+        assert len(result.columns["brand"]) == len(result.columns["rating"]) == 1
+        assert result.columns["brand"].values == ["apple"]
+
+
+class TestDictionaryColumn:
+    """Tests for dictionary-encoded columns"""
+
+    def test_encoding(self) -> None:
+        """Test that each distinct value gets one code"""
+        column = DictionaryColumn()
+        for value in ("apple", "samsung", "apple", "xiaomi", "apple"):
+            column.append(value)
+
+        assert column.values == ["apple", "samsung", "xiaomi"]
+        assert list(column.codes) == [0, 1, 0, 2, 0]
+        assert list(column) == ["apple", "samsung", "apple", "xiaomi", "apple"]
+        assert len(column) == 5
+
+    def test_encoded_table(self, sample_product_data: list[dict[str, str]]) -> None:
+        """Test that encoded columns decode transparently in row views"""
+        table = ColumnarRows(HEADER, numeric_columns=("rating",), encoded_columns=("brand",))
+        table.extend(HEADER, ([row[name] for name in HEADER] for row in sample_product_data))
+
+        assert isinstance(table.columns["brand"], DictionaryColumn)
+        assert table.columns["brand"].values == ["apple", "samsung", "xiaomi"]
+        assert table[3]["brand"] == "xiaomi"
+        assert table[3]["price"] == "299"
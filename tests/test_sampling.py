@@ -0,0 +1,227 @@
+"""Unit tests for sampling.py and sampled reading in utils.py"""
+
+from __future__ import annotations
+
+import math
+import random
+
+import pytest
+
+from src.report_factory import ReportFactory
+from src.sampling import MISSING_GROUPS_NOTE, MomentsAggregate, SampledReports
+from src.utils import SerializeCSV
+
+
+@pytest.fixture
+def large_csv_file(tmp_path) -> dict[str, str]:
+    """CSV file with 6000 rows of two big brands and one tiny brand"""
+    rng = random.Random(7)
+    lines = ["name,brand,price,rating"]
+    for i in range(6000):
+        brand = "apple" if i % 2 else "samsung"
+        lines.append(f"product {i},{brand},{100 + i % 50},{rng.uniform(3.0, 5.0):.2f}")
+    lines.insert(3000, "rare phone,nokia,99,3.3")
+    (tmp_path / "large.csv").write_text("\n".join(lines) + "\n")
+    return {"dir": str(tmp_path), "file": "large.csv"}
+
+
+class TestIterSampledRows:
+    """Tests for SerializeCSV.iter_sampled_rows"""
+
+    def test_full_rate_reads_every_row_once(self, temp_csv_files: dict[str, str]) -> None:
+        """Test that tiny blocks at rate 1 split rows without loss or duplicates"""
+        serializer = SerializeCSV((temp_csv_files["file1"], temp_csv_files["file2"]), temp_csv_files["data_dir"])
+
+        for block_size in (1, 7, 16, 1024):
+            assert list(serializer.iter_sampled_rows(1.0, block_size=block_size)) == list(serializer.iter_rows())
+
+    def test_partial_rate_yields_whole_rows(self, large_csv_file: dict[str, str]) -> None:
+        """Test that a partial sample contains complete, distinct rows"""
+        serializer = SerializeCSV((large_csv_file["file"],), large_csv_file["dir"])
+        all_rows = {row["name"]: row for row in serializer.iter_rows()}
+
+        sample = list(serializer.iter_sampled_rows(0.3, block_size=512, seed=1))
+
+        assert 0 < len(sample) < len(all_rows)
+        assert len({row["name"] for row in sample}) == len(sample)
+        for row in sample:
+            assert all_rows[row["name"]] == row
+
+    def test_seed_is_reproducible(self, large_csv_file: dict[str, str]) -> None:
+        """Test that the same seed selects the same blocks"""
+        serializer = SerializeCSV((large_csv_file["file"],), large_csv_file["dir"])
+
+        first = list(serializer.iter_sampled_rows(0.2, block_size=512, seed=3))
+        assert first == list(serializer.iter_sampled_rows(0.2, block_size=512, seed=3))
+
+    @pytest.mark.parametrize("rate", [0, -0.5, 1.5])
+    def test_invalid_rate(self, rate: float) -> None:
+        """Test that rates outside (0, 1] are rejected"""
+        with pytest.raises(ValueError):
+            list(SerializeCSV(()).iter_sampled_rows(rate))
+
+
+class TestMomentsAggregate:
+    """Tests for MomentsAggregate"""
+
+    def test_mean_and_margin(self) -> None:
+        """Test mean and confidence interval of a small sample"""
+        state = MomentsAggregate()
+        for value in (4.0, 4.5, 5.0):
+            state = state + MomentsAggregate.of_block(value, 1)
+
+        assert state.mean == 4.5
+        # With one row per block this is the i.i.d. interval; sample standard deviation is 0.5
+        assert state.margin == pytest.approx(1.96 * 0.5 / math.sqrt(3))
+
+    def test_single_block_margin(self) -> None:
+        """Test that a group seen in a single block has an unbounded interval"""
+        assert MomentsAggregate.of_block(4.0, 1).margin == math.inf
+        assert (MomentsAggregate.of_block(12.0, 3) + MomentsAggregate.of_block(0.0, 0)).margin == math.inf
+
+    def test_margin_uses_block_variation(self) -> None:
+        """Test that alike rows within blocks widen the interval"""
+        # Two blocks of three identical values each
+        clustered = MomentsAggregate.of_block(12.0, 3) + MomentsAggregate.of_block(15.0, 3)
+        independent = MomentsAggregate()
+        for value in (4.0, 4.0, 4.0, 5.0, 5.0, 5.0):
+            independent = independent + MomentsAggregate.of_block(value, 1)
+
+        assert clustered.mean == independent.mean == 4.5
+        assert clustered.margin == pytest.approx(1.96 * 0.5)
+        assert clustered.margin > 2 * independent.margin
+
+
+class TestSampledReports:
+    """Tests for SampledReports.aggregate"""
+
+    def test_estimates_within_interval(self, large_csv_file: dict[str, str]) -> None:
+        """Test that estimates of big groups are close to the exact averages"""
+        serializer = SerializeCSV((large_csv_file["file"],), large_csv_file["dir"])
+        exact = SampledReports.aggregate_moments([serializer.iter_rows()], ("brand", "rating"))
+
+        result = SampledReports.aggregate(serializer, ("brand", "rating"), 0.5, block_size=1024, seed=5)
+
+        for brand in ("apple", "samsung"):
+            estimate = result.estimates[brand]
+            assert not estimate.exact
+            assert 0 < estimate.count < exact[brand].count
+            assert abs(estimate.average - exact[brand].mean) <= 2 * estimate.margin
+
+    def test_interval_covers_clustered_file(self, tmp_path) -> None:
+        """Test the interval on a file sorted so that ratings are alike within blocks"""
+        lines = ["name,brand,price,rating"]
+        for i in range(20000):
+            lines.append(f"product {i:05},apple,100,{1 + (i // 400) % 5}.0")
+        (tmp_path / "sorted.csv").write_text("\n".join(lines) + "\n")
+        serializer = SerializeCSV(("sorted.csv",), str(tmp_path))
+        exact = SampledReports.aggregate_moments([serializer.iter_rows()], ("brand", "rating"))["apple"].mean
+
+        covered = 0
+        for seed in range(40):
+            result = SampledReports.aggregate(serializer, ("brand", "rating"), 0.2, block_size=4096, seed=seed)
+            estimate = result.estimates["apple"]
+            # Rows treated as independent would give a margin of about 0.05 here
+            assert estimate.margin > 0.2
+            covered += abs(estimate.average - exact) <= estimate.margin
+
+        assert covered >= 32
+
+    def test_small_group_falls_back_to_exact(self, large_csv_file: dict[str, str]) -> None:
+        """Test that with the fallback groups with too few sampled rows are computed exactly"""
+        serializer = SerializeCSV((large_csv_file["file"],), large_csv_file["dir"])
+
+        result = SampledReports.aggregate(serializer, ("brand", "rating"), 0.5, seed=5, exact_fallback=True)
+
+        assert result.estimates["nokia"].exact
+        assert result.estimates["nokia"].average == 3.3
+        assert result.estimates["nokia"].margin == 0.0
+
+    def test_unsampled_group_is_exact(self, large_csv_file: dict[str, str]) -> None:
+        """Test that with the fallback groups missed by the sample are still reported exactly"""
+        serializer = SerializeCSV((large_csv_file["file"],), large_csv_file["dir"])
+
+        for seed in range(20):
+            result = SampledReports.aggregate(
+                serializer, ("brand", "rating"), 0.1, block_size=1024, seed=seed, exact_fallback=True
+            )
+
+            assert result.estimates["nokia"] == ("nokia", 3.3, 0.0, 1, True)
+            assert set(result.estimates) == {"apple", "samsung", "nokia"}
+            assert result.complete
+
+    def test_reads_only_sampled_blocks(self, large_csv_file: dict[str, str], monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test that without the fallback no full pass is made and missed groups are reported as missing"""
+        serializer = SerializeCSV((large_csv_file["file"],), large_csv_file["dir"])
+        monkeypatch.setattr(SerializeCSV, "iter_rows", lambda *args: pytest.fail("full pass over the input"))
+
+        missed = 0
+        for seed in range(20):
+            result = SampledReports.aggregate(serializer, ("brand", "rating"), 0.1, block_size=1024, seed=seed)
+
+            assert not result.complete
+            assert {"apple", "samsung"} <= set(result.estimates)
+            assert not any(item.exact for item in result.results())
+            assert result.to_table().endswith(MISSING_GROUPS_NOTE)
+            missed += "nokia" not in result.estimates
+
+        assert missed > 0
+
+    def test_full_rate_is_exact(self, large_csv_file: dict[str, str]) -> None:
+        """Test that sampling every block gives exact values for every group"""
+        serializer = SerializeCSV((large_csv_file["file"],), large_csv_file["dir"])
+
+        result = SampledReports.aggregate(serializer, ("brand", "rating"), 1.0, block_size=1024)
+
+        assert result.complete
+        assert result.input_rows == 6001
+        assert result.estimates["nokia"] == ("nokia", 3.3, 0.0, 1, True)
+        assert all(item.exact for item in result.results())
+
+    def test_input_rows(self, large_csv_file: dict[str, str]) -> None:
+        """Test that the input row count covers every row, not just the sampled ones"""
+        serializer = SerializeCSV((large_csv_file["file"],), large_csv_file["dir"])
+
+        exact = SampledReports.aggregate(
+            serializer, ("brand", "rating"), 0.2, block_size=1024, seed=3, exact_fallback=True
+        )
+        estimated = SampledReports.aggregate(serializer, ("brand", "rating"), 0.2, block_size=1024, seed=3)
+
+        assert exact.input_rows == 6001
+        assert sum(item.count for item in estimated.results()) < 6001
+        # Scaled up from the share of bytes in the sampled blocks
+        assert estimated.input_rows == pytest.approx(6001, rel=0.05)
+
+    def test_empty_sample_is_exact(self, temp_csv_files: dict[str, str]) -> None:
+        """Test that an empty sample falls back to an exact report"""
+        serializer = SerializeCSV((temp_csv_files["file1"], temp_csv_files["file2"]), temp_csv_files["data_dir"])
+
+        result = SampledReports.aggregate(serializer, ("brand", "rating"), 0.01, seed=0, exact_fallback=True)
+
+        assert [item.group for item in result.results()] == ["samsung", "apple", "xiaomi"]
+        assert all(item.exact for item in result.results())
+
+    def test_empty_sample_without_fallback(self, temp_csv_files: dict[str, str]) -> None:
+        """Test that an empty sample without the fallback lists no groups and no row count"""
+        serializer = SerializeCSV((temp_csv_files["file1"], temp_csv_files["file2"]), temp_csv_files["data_dir"])
+
+        result = SampledReports.aggregate(serializer, ("brand", "rating"), 0.01, seed=0)
+
+        assert result.results() == []
+        assert result.input_rows is None
+        assert result.to_table() == MISSING_GROUPS_NOTE
+
+    def test_report_factory_sample(self, large_csv_file: dict[str, str]) -> None:
+        """Test sampled report table through ReportFactory"""
+        result = ReportFactory.get_report(
+            files=(large_csv_file["file"],),
+            columns=("brand", "rating"),
+            data_root=large_csv_file["dir"],
+            sample=0.5,
+            sample_exact_fallback=True,
+        )
+
+        assert "±95%" in result
+        assert "exact" in result  # nokia is always exact
+        assert "apple" in result
+        assert MISSING_GROUPS_NOTE not in result
@@ -0,0 +1,135 @@
+"""Scale tests: memory and throughput ceilings on generated inputs
+
+These tests generate a large CSV file once per module and check that
+the streaming code paths keep peak memory flat and process rows at a
+minimum rate. Run them alone with ``pytest -m scale`` or skip them with
+``pytest -m "not scale"``.
+"""
+
+from __future__ import annotations
+
+import csv
+import time
+import tracemalloc
+from collections.abc import Callable
+
+import pytest
+
+from src.report_factory import ReportFactory
+from src.reports import BrandReports
+from src.utils import SerializeCSV
+
+pytestmark = pytest.mark.scale
+
+SCALE_ROWS = 50_000
+SCALE_BRANDS = 50
+# Streaming keeps a few KB of state; materializing the rows as dictionaries takes ~20 MB
+STREAMING_PEAK_BYTES = 4 * 1024 * 1024
+COMPACT_BYTES_PER_ROW = 200
+# Floors are ~10x below the rates on a developer laptop, to stay stable on slow CI runners
+MIN_ROWS_PER_SECOND = {
+    "iter_rows": 40_000,
+    "iter_rows_projected": 80_000,
+    "aggregate": 40_000,
+    "aggregate_distinct": 20_000,
+    "get_report": 40_000,
+}
+
+
+@pytest.fixture(scope="module")
+def scale_csv(tmp_path_factory: pytest.TempPathFactory) -> dict[str, str]:
+    """Generates a CSV file with SCALE_ROWS products"""
+    data_dir = tmp_path_factory.mktemp("scale")
+    with open(data_dir / "products.csv", "w", newline="") as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(["name", "brand", "price", "rating"])
+        for i in range(SCALE_ROWS):
+            writer.writerow([f"product {i}", f"brand {i % SCALE_BRANDS}", 100 + i % 900, f"{1 + i * 7 % 40 / 10:.1f}"])
+    return {"data_dir": str(data_dir), "file": "products.csv"}
+
+
+def measure(function: Callable[[], object]) -> tuple[float, int]:
+    """Run a function twice: once timed, once with tracemalloc
+
+    Returns:
+        Rows per second of the timed run and peak traced bytes of the other
+    """
+    start = time.perf_counter()
+    function()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    try:
+        function()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return SCALE_ROWS / elapsed, peak
+
+
+class TestStreamingScale:
+    """Tests that streaming paths don't grow with the input"""
+
+    def test_iter_rows(self, scale_csv: dict[str, str]) -> None:
+        """Test streaming full rows"""
+        serializer = SerializeCSV((scale_csv["file"],), scale_csv["data_dir"])
+
+        rate, peak = measure(lambda: sum(1 for _ in serializer.iter_rows()))
+
+        assert peak < STREAMING_PEAK_BYTES
+        assert rate > MIN_ROWS_PER_SECOND["iter_rows"]
+
+    def test_iter_rows_projected(self, scale_csv: dict[str, str]) -> None:
+        """Test streaming projected rows"""
+        serializer = SerializeCSV((scale_csv["file"],), scale_csv["data_dir"])
+
+        rate, peak = measure(lambda: sum(1 for _ in serializer.iter_rows(("brand", "rating"))))
+
+        assert peak < STREAMING_PEAK_BYTES
+        assert rate > MIN_ROWS_PER_SECOND["iter_rows_projected"]
+
+    def test_aggregate(self, scale_csv: dict[str, str]) -> None:
+        """Test aggregating a stream of rows"""
+        serializer = SerializeCSV((scale_csv["file"],), scale_csv["data_dir"])
+        columns = ("brand", "rating")
+
+        rate, peak = measure(lambda: BrandReports.aggregate(serializer.iter_rows(columns), columns))
+
+        assert peak < STREAMING_PEAK_BYTES
+        assert rate > MIN_ROWS_PER_SECOND["aggregate"]
+
+    def test_aggregate_distinct(self, scale_csv: dict[str, str]) -> None:
+        """Test aggregating with distinct sketches, which take 2**precision bytes per group"""
+        serializer = SerializeCSV((scale_csv["file"],), scale_csv["data_dir"])
+        columns = ("brand", "rating")
+
+        rate, peak = measure(
+            lambda: BrandReports.aggregate(serializer.iter_rows((*columns, "name")), columns, "name", precision=12)
+        )
+
+        assert peak < STREAMING_PEAK_BYTES + SCALE_BRANDS * 2**12
+        assert rate > MIN_ROWS_PER_SECOND["aggregate_distinct"]
+
+    def test_get_report(self, scale_csv: dict[str, str]) -> None:
+        """Test the end-to-end report"""
+        files = (scale_csv["file"],)
+
+        rate, peak = measure(lambda: ReportFactory.get_report(files, ("brand", "rating"), scale_csv["data_dir"]))
+
+        assert peak < STREAMING_PEAK_BYTES
+        assert rate > MIN_ROWS_PER_SECOND["get_report"]
+
+
+class TestCompactScale:
+    """Tests for the memory use of in-memory tables"""
+
+    def test_compact_table(self, scale_csv: dict[str, str]) -> None:
+        """Test that the compact table stays well below one dictionary per row"""
+        serializer = SerializeCSV((scale_csv["file"],), scale_csv["data_dir"])
+
+        _, peak = measure(
+            lambda: serializer.get_full_data_from_files(
+                compact=True, numeric_columns=("price", "rating"), encoded_columns=("brand",)
+            )
+        )
+
+        assert peak < SCALE_ROWS * COMPACT_BYTES_PER_ROW
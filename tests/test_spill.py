@@ -0,0 +1,148 @@
+"""Unit tests for spill.py"""
+
+from __future__ import annotations
+
+import io
+import os
+import tracemalloc
+
+import pytest
+
+from src.report_factory import ReportFactory
+from src.reports import BrandReports
+from src.spill import SpilledAverages, SpillingReports
+
+
+@pytest.fixture
+def many_groups_data() -> list[dict[str, str]]:
+    """2000 rows over 500 distinct product names"""
+    return [{"name": f"product {i % 500}", "rating": f"{i % 7 + 1}.{i % 10}"} for i in range(2000)]
+
+
+class TestSpillingReports:
+    """Tests for SpillingReports.aggregate"""
+
+    def test_fits_in_memory(self, sample_product_data: list[dict[str, str]]) -> None:
+        """Test that small inputs are aggregated without spilling"""
+        result = SpillingReports.aggregate(sample_product_data, ("brand", "rating"), memory_limit=1 << 20)
+
+        assert result == BrandReports.aggregate(sample_product_data, ("brand", "rating"))
+
+    def test_spill_matches_in_memory_result(
+        self, many_groups_data: list[dict[str, str]], tmp_path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Test that spilled partitions merge into the exact result"""
+        spills = []
+        spill = SpillingReports._spill
+        monkeypatch.setattr(
+            SpillingReports, "_spill", staticmethod(lambda *args: spills.append(len(args[0])) or spill(*args))
+        )
+
+        result = SpillingReports.aggregate(
+            many_groups_data, ("name", "rating"), memory_limit=10_000, temp_dir=str(tmp_path)
+        )
+        expected = BrandReports.aggregate(many_groups_data, ("name", "rating"))
+
+        assert spills, "expected the group state to be spilled"
+        assert isinstance(result, SpilledAverages)
+        with result:
+            assert sorted(result.results()) == sorted(expected.results())
+            averages = [item.average for item in result.results()]
+            assert averages == sorted(averages, reverse=True)
+        # Spill files are removed afterwards
+        assert os.listdir(tmp_path) == []
+
+    def test_spill_with_single_partition(self, many_groups_data: list[dict[str, str]]) -> None:
+        """Test merging when every group lands in one partition"""
+        with SpillingReports.aggregate(
+            many_groups_data, ("name", "rating"), memory_limit=5_000, partitions=1
+        ) as result:
+            items = list(result.results())
+
+        assert len(items) == 500
+        assert sum(item.count for item in items) == 2000
+
+    def test_partition_is_split_again(
+        self, many_groups_data: list[dict[str, str]], monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Test that a partition larger than the budget is split by the next hash digit"""
+        depths = []
+        spill = SpillingReports._spill
+        monkeypatch.setattr(
+            SpillingReports, "_spill", staticmethod(lambda *args: depths.append(args[3:]) or spill(*args))
+        )
+
+        with SpillingReports.aggregate(
+            many_groups_data, ("name", "rating"), memory_limit=5_000, partitions=2
+        ) as result:
+            items = list(result.results())
+
+        assert max(depths) >= (1,)
+        assert sorted(items) == sorted(BrandReports.aggregate(many_groups_data, ("name", "rating")).results())
+
+    def test_spill_with_distinct(self, many_groups_data: list[dict[str, str]]) -> None:
+        """Test that distinct sketches survive spilling"""
+        rows = [dict(row, brand=f"brand {i % 50}") for i, row in enumerate(many_groups_data)]
+
+        result = SpillingReports.aggregate(
+            rows, ("brand", "rating"), memory_limit=2_000, distinct_column="name", precision=8
+        )
+        expected = BrandReports.aggregate(rows, ("brand", "rating"), "name", precision=8)
+
+        with result:
+            assert sorted(result.results()) == sorted(expected.results())
+
+    def test_table_matches_in_memory_table(self) -> None:
+        """Test that a streamed table is laid out like the in-memory one"""
+        rows = [
+            {"name": f"product {i}", "rating": rating, "brand": f"brand {i % 3}"}
+            for i, rating in enumerate(["4.55", "1099", "4", "1e20", "0.00001", "3.5", "4.5"])
+        ]
+
+        with SpillingReports.aggregate(rows, ("name", "rating"), memory_limit=1, distinct_column="brand") as result:
+            output = io.StringIO()
+            result.write_table(output)
+
+        assert output.getvalue() == BrandReports.aggregate(rows, ("name", "rating"), "brand").to_table()
+
+    def test_memory_stays_near_limit(self, tmp_path) -> None:
+        """Test that aggregating and writing many groups stays near the memory budget"""
+        memory_limit = 200_000
+
+        def rows():
+            for i in range(20_000):
+                yield {"name": f"product {i:08d}", "rating": str(i % 50 / 10)}
+
+        tracemalloc.start()
+        try:
+            with SpillingReports.aggregate(rows(), ("name", "rating"), memory_limit) as result:
+                with open(tmp_path / "report.txt", "w") as output:
+                    result.write_table(output)
+                groups = sum(1 for _ in result.results())
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        assert groups == 20_000
+        # Keeping all 20000 groups in memory would take over 25 times the budget
+        assert peak < 2 * memory_limit
+
+    def test_report_factory_memory_limit(self, temp_csv_files: dict[str, str]) -> None:
+        """Test spilling report through ReportFactory"""
+        files = (temp_csv_files["file1"], temp_csv_files["file2"])
+
+        result = ReportFactory.get_report(files, ("brand", "rating"), temp_csv_files["data_dir"], memory_limit=1)
+
+        assert result == ReportFactory.get_report(files, ("brand", "rating"), temp_csv_files["data_dir"])
+
+    def test_write_reports_memory_limit(self, temp_csv_files: dict[str, str]) -> None:
+        """Test that write_reports streams the same output get_reports returns"""
+        files = (temp_csv_files["file1"], temp_csv_files["file2"])
+        output = io.StringIO()
+
+        ReportFactory.write_reports(
+            output, files, ["average-rating", "average-price"], temp_csv_files["data_dir"], memory_limit=1
+        )
+
+        expected = ReportFactory.get_reports(files, ["average-rating", "average-price"], temp_csv_files["data_dir"])
+        assert output.getvalue() == expected
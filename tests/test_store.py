@@ -0,0 +1,137 @@
+"""Unit tests for store.py"""
+
+from __future__ import annotations
+
+import json
+from datetime import UTC, datetime, timedelta
+
+import pytest
+
+from src.report_factory import ReportFactory
+from src.reports import BrandReports
+from src.sampling import GroupEstimate, SampledAverages
+from src.store import ResultStore, RunInfo, parse_timestamp
+
+
+@pytest.fixture
+def store():
+    """In-memory result store"""
+    with ResultStore(":memory:") as result_store:
+        yield result_store
+
+
+class TestResultStore:
+    """Tests for saving and querying report results"""
+
+    def test_save(self, store: ResultStore, sample_product_data: list[dict[str, str]]) -> None:
+        """Test that results and run metadata are stored"""
+        result = BrandReports.aggregate(sample_product_data, ("brand", "rating"))
+        started_at = datetime(2024, 5, 1, 12, tzinfo=UTC)
+
+        run_ids = store.save(RunInfo(("a.csv", "b.csv"), started_at, 0.5), {"average-rating": result})
+
+        run = store.connection.execute(
+            "SELECT report, inputs, rows, started_at, elapsed FROM runs WHERE id = ?", run_ids
+        ).fetchone()
+        assert run == ("average-rating", json.dumps(["a.csv", "b.csv"]), 6, "2024-05-01T12:00:00+00:00", 0.5)
+        history = store.history(("brand", "rating"))
+        assert [(point.group, point.average, point.count) for point in history] == [
+            ("apple", 4.5, 2),
+            ("samsung", 4.7, 2),
+            ("xiaomi", 4.5, 2),
+        ]
+
+    def test_save_is_one_transaction(self, store: ResultStore, sample_product_data: list[dict[str, str]]) -> None:
+        """Test that a failed save leaves no partial runs behind"""
+        result = BrandReports.aggregate(sample_product_data, ("brand", "rating"))
+        run = RunInfo(("a.csv",), datetime.now(UTC), 0.1)
+
+        with pytest.raises(AttributeError):
+            store.save(run, {"average-rating": result, "broken": None})
+
+        assert store.connection.execute("SELECT COUNT(*) FROM runs").fetchone() == (0,)
+        assert store.history(("brand", "rating")) == []
+
+    def test_history_filters(self, store: ResultStore, sample_product_data: list[dict[str, str]]) -> None:
+        """Test querying the time series of one group"""
+        start = datetime(2024, 5, 1, tzinfo=UTC)
+        for day in range(3):
+            rows = [dict(row, rating=str(float(row["rating"]) - day / 10)) for row in sample_product_data]
+            result = BrandReports.aggregate(rows, ("brand", "rating"))
+            store.save(RunInfo(("a.csv",), start + timedelta(days=day), 0.1), {"average-rating": result})
+        store.save(
+            RunInfo(("a.csv",), start, 0.1),
+            {"average-price": BrandReports.aggregate(sample_product_data, ("brand", "price"))},
+        )
+
+        history = store.history(("brand", "rating"), group="apple")
+
+        assert [point.average for point in history] == [4.5, 4.4, 4.3]
+        assert len(store.history(("brand", "rating"), since=parse_timestamp("2024-05-02"))) == 6
+        assert store.history(("brand", "rating"), report="average-price") == []
+        assert len(store.history(("brand", "price"))) == 3
+
+    @pytest.mark.parametrize(
+        "filters", [{"group": "apple"}, {"group": "apple", "report": "average-rating", "since": datetime.now(UTC)}]
+    )
+    def test_group_history_uses_indexes(self, store: ResultStore, filters: dict) -> None:
+        """Test that the query history() runs for one group is served by indexes without sorting"""
+        query, parameters = store.history_query(("brand", "rating"), **filters)
+
+        plan = " ".join(str(step[3]) for step in store.connection.execute(f"EXPLAIN QUERY PLAN {query}", parameters))
+
+        assert "runs_by_columns" in plan
+        assert "results USING PRIMARY KEY (run_id=? AND group_value=?)" in plan
+        assert "SCAN" not in plan
+        assert "TEMP B-TREE" not in plan
+
+    def test_save_distinct_and_sampled(self, store: ResultStore, sample_product_data: list[dict[str, str]]) -> None:
+        """Test storing distinct counts and sampled estimates"""
+        distinct = BrandReports.aggregate(sample_product_data, ("brand", "rating"), "name")
+        sampled = SampledAverages("brand", "price", {"apple": GroupEstimate("apple", 700.0, 50.0, 40, False)})
+
+        store.save(RunInfo(("a.csv",), datetime.now(UTC), 0.1, sample=0.5), {None: distinct, "sampled": sampled})
+
+        assert {point.distinct for point in store.history(("brand", "rating"))} == {2}
+        assert store.connection.execute("SELECT rows, input_rows FROM runs ORDER BY id").fetchall() == [
+            (6, 6),
+            (40, None),
+        ]
+        assert store.connection.execute("SELECT margin FROM results WHERE average = 700.0").fetchone() == (50.0,)
+        assert "distinct" in store.history_table(("brand", "rating"))
+
+
+class TestReportFactoryStore:
+    """Tests for saving report runs from ReportFactory"""
+
+    def test_get_report_store(self, store: ResultStore, temp_csv_files: dict[str, str]) -> None:
+        """Test that get_report saves what it prints"""
+        files = (temp_csv_files["file1"], temp_csv_files["file2"])
+
+        table = ReportFactory.get_report(
+            files, ("brand", "rating"), temp_csv_files["data_dir"], store=store, report_name="average-rating"
+        )
+
+        assert table == ReportFactory.get_report(files, ("brand", "rating"), temp_csv_files["data_dir"])
+        assert [point.group for point in store.history(("brand", "rating"), report="average-rating")] == [
+            "apple",
+            "samsung",
+            "xiaomi",
+        ]
+
+    def test_get_reports_store(self, tmp_path, temp_csv_files: dict[str, str]) -> None:
+        """Test that several reports are saved under their names and persist"""
+        path = str(tmp_path / "results.db")
+        files = (temp_csv_files["file1"], temp_csv_files["file2"])
+        with ResultStore(path) as store:
+            ReportFactory.get_reports(
+                files, ["average-rating", "average-price"], temp_csv_files["data_dir"], store=store
+            )
+
+        with ResultStore(path) as store:
+            reports = store.connection.execute("SELECT report, rows, data_root FROM runs ORDER BY id").fetchall()
+            assert reports == [
+                ("average-rating", 6, temp_csv_files["data_dir"]),
+                ("average-price", 6, temp_csv_files["data_dir"]),
+            ]
+            assert store.history(("brand", "price"), group="apple")[0].average == 714.0
@@ -2,11 +2,14 @@
 
 from __future__ import annotations
 
+import csv
 import os
+import tracemalloc
 
 import pytest
 
-from src.utils import SerializeCSV
+from src.rows import ColumnarRows
+from src.utils import SerializeCSV, parse_size
 
 
 class TestSerializeCSVMultipleFiles:
@@ -98,8 +101,8 @@ class TestSerializeCSVMultipleFiles:
         finally:
             os.chdir(original_cwd)
 
-    def test_full_data_accumulation(self, temp_csv_files: dict[str, str]) -> None:
-        """Test data accumulation in full_data on repeated calls"""
+    def test_full_data_is_replaced(self, temp_csv_files: dict[str, str]) -> None:
+        """Test that repeated calls return the same rows instead of accumulating them"""
         original_cwd = os.getcwd()
         try:
             os.chdir(temp_csv_files["dir"])
@@ -110,25 +113,15 @@ class TestSerializeCSVMultipleFiles:
             result1 = serializer.get_full_data_from_files()
             assert len(result1) == 6
 
-            # Second call - data should accumulate
+            # Second call - data is read again, not appended
             result2 = serializer.get_full_data_from_files()
-            assert len(result2) == 12, f"Expected 12 records (6*2), got {len(result2)}"
+            assert len(result2) == 6, f"Expected 6 records, got {len(result2)}"
 
-            # Check that data accumulates (first 6 records from first call)
-            expected_first_6 = [
-                {"name": "iphone 15 pro", "brand": "apple", "price": "999", "rating": "4.9"},
-                {"name": "galaxy s23 ultra", "brand": "samsung", "price": "1199", "rating": "4.8"},
-                {"name": "redmi note 12", "brand": "xiaomi", "price": "199", "rating": "4.6"},
-                {"name": "poco x5 pro", "brand": "xiaomi", "price": "299", "rating": "4.4"},
-                {"name": "iphone se", "brand": "apple", "price": "429", "rating": "4.1"},
-                {"name": "galaxy z flip 5", "brand": "samsung", "price": "999", "rating": "4.6"},
-            ]
-
-            # Check that first 6 records match expected
-            assert result2[:6] == expected_first_6
-
-            # Check that last 6 records duplicate first 6
-            assert result2[6:] == expected_first_6
+            # Check that the second call returns a new list with the same records
+            assert result2 == result1
+            assert result2 is not result1
+            assert len(result1) == 6
+            assert serializer.full_data is result2
 
         finally:
             os.chdir(original_cwd)
@@ -178,3 +171,215 @@ class TestSerializeCSVMultipleFiles:
 
         finally:
             os.chdir(original_cwd)
+
+
+class TestSerializeCSVInputs:
+    """Tests for directory, glob and data root inputs"""
+
+    def test_custom_data_root(self, temp_csv_files: dict[str, str]) -> None:
+        """Test resolving file names against a custom data root"""
+        serializer = SerializeCSV((temp_csv_files["file1"],), data_root=temp_csv_files["data_dir"])
+        result = serializer.get_full_data_from_files()
+
+        assert len(result) == 3
+        assert result[0]["name"] == "iphone 15 pro"
+
+    def test_directory_input(self, temp_csv_files: dict[str, str]) -> None:
+        """Test that a directory expands to all CSV files inside it"""
+        with open(os.path.join(temp_csv_files["data_dir"], "notes.txt"), "w") as f:
+            f.write("not a csv")
+
+        serializer = SerializeCSV((temp_csv_files["data_dir"],), data_root="")
+        result = serializer.get_full_data_from_files()
+
+        # Both CSV files are read, the text file is ignored
+        assert sorted(serializer.iter_file_paths()) == [temp_csv_files["file1_path"], temp_csv_files["file2_path"]]
+        assert len(result) == 6
+        assert {row["brand"] for row in result} == {"apple", "samsung", "xiaomi"}
+
+    def test_directory_is_listed_lazily(self, temp_csv_files: dict[str, str], monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test that directory entries are yielded while the listing is still running"""
+        scandir = os.scandir
+
+        class FailingListing:
+            def __init__(self, path: str) -> None:
+                self.entries = scandir(path)
+
+            def __enter__(self) -> FailingListing:
+                return self
+
+            def __exit__(self, *exc_info: object) -> None:
+                self.entries.close()
+
+            def __iter__(self):
+                yield next(entry for entry in self.entries if entry.name.endswith(".csv"))
+                raise OSError("listing interrupted")
+
+        monkeypatch.setattr(os, "scandir", FailingListing)
+        paths = SerializeCSV((temp_csv_files["data_dir"],), data_root="").iter_file_paths()
+
+        assert next(paths).endswith(".csv")
+        with pytest.raises(OSError, match="listing interrupted"):
+            next(paths)
+
+    def test_directory_without_csv_files(self, tmp_path) -> None:
+        """Test that a directory without CSV files raises FileNotFoundError like an unmatched pattern"""
+        (tmp_path / "notes.txt").write_text("not a csv")
+        serializer = SerializeCSV((str(tmp_path),), data_root="")
+
+        with pytest.raises(FileNotFoundError):
+            list(serializer.iter_rows())
+
+    def test_pattern_characters(self, temp_csv_files: dict[str, str]) -> None:
+        """Test that only names with *, ? or [ are treated as patterns"""
+        assert len(list(SerializeCSV(("test_products?.csv",), temp_csv_files["data_dir"]).iter_file_paths())) == 2
+        assert len(list(SerializeCSV(("test_products[12].csv",), temp_csv_files["data_dir"]).iter_file_paths())) == 2
+        assert list(SerializeCSV((temp_csv_files["file1"],), temp_csv_files["data_dir"]).iter_file_paths()) == [
+            temp_csv_files["file1_path"]
+        ]
+
+    @pytest.mark.parametrize("file_name", ["../outside.csv", "../*.csv", "{outside}", "link.csv", "linked"])
+    def test_confine_rejects_paths_outside_root(self, tmp_path, file_name: str) -> None:
+        """Test that confined inputs can't escape the data root through .., absolute paths, globs or symlinks"""
+        root = tmp_path / "root"
+        root.mkdir()
+        outside = tmp_path / "outside.csv"
+        outside.write_text("brand,rating\nsecret,5\n")
+        (root / "link.csv").symlink_to(outside)
+        (root / "linked").symlink_to(tmp_path)
+        serializer = SerializeCSV((file_name.format(outside=outside),), data_root=str(root), confine=True)
+
+        with pytest.raises(PermissionError):
+            list(serializer.iter_rows())
+
+    def test_confine_allows_paths_inside_root(self, temp_csv_files: dict[str, str]) -> None:
+        """Test that confined inputs inside the data root are read normally"""
+        os.mkdir(os.path.join(temp_csv_files["data_dir"], "sub"))
+        files = ("sub/../test_products1.csv", "test_products*.csv", ".")
+        serializer = SerializeCSV(files, data_root=temp_csv_files["data_dir"], confine=True)
+
+        assert len(list(serializer.iter_rows())) == 15
+
+    def test_glob_input(self, temp_csv_files: dict[str, str]) -> None:
+        """Test that glob patterns expand to matching files"""
+        serializer = SerializeCSV(("test_products*.csv",), data_root=temp_csv_files["data_dir"])
+        paths = sorted(serializer.iter_file_paths())
+
+        assert paths == [temp_csv_files["file1_path"], temp_csv_files["file2_path"]]
+        assert len(list(serializer.iter_rows())) == 6
+
+    def test_glob_without_matches(self, temp_csv_files: dict[str, str]) -> None:
+        """Test that a pattern matching nothing raises FileNotFoundError"""
+        serializer = SerializeCSV(("missing_*.csv",), data_root=temp_csv_files["data_dir"])
+
+        with pytest.raises(FileNotFoundError):
+            list(serializer.iter_rows())
+
+    def test_iter_rows_projection(self, temp_csv_files: dict[str, str]) -> None:
+        """Test reading only the requested columns"""
+        serializer = SerializeCSV((temp_csv_files["file1"],), data_root=temp_csv_files["data_dir"])
+
+        assert next(serializer.iter_rows(("rating", "brand"))) == {"rating": "4.9", "brand": "apple"}
+        with pytest.raises(ValueError):
+            list(serializer.iter_rows(("brand", "color")))
+
+    def test_iter_rows_projection_short_rows(self, tmp_path) -> None:
+        """Test that projected short rows get None for missing fields, as dictionaries do"""
+        (tmp_path / "short.csv").write_text("name,brand,rating\nx,apple,4.5\ny,xiaomi\nz\n")
+        serializer = SerializeCSV(("short.csv",), str(tmp_path))
+
+        rows = list(serializer.iter_rows(("rating", "brand")))
+
+        assert rows == [
+            {"rating": "4.5", "brand": "apple"},
+            {"rating": None, "brand": "xiaomi"},
+            {"rating": None, "brand": None},
+        ]
+        assert rows == [{"rating": row["rating"], "brand": row["brand"]} for row in serializer.iter_rows()]
+
+    def test_iter_rows_is_lazy(self, temp_csv_files: dict[str, str]) -> None:
+        """Test that rows are streamed before later inputs are resolved"""
+        serializer = SerializeCSV((temp_csv_files["file1"], "nonexistent.csv"), data_root=temp_csv_files["data_dir"])
+        rows = serializer.iter_rows()
+
+        # First file is read before the missing second file is reached
+        assert next(rows)["name"] == "iphone 15 pro"
+        assert serializer.full_data == []
+        with pytest.raises(FileNotFoundError):
+            list(rows)
+
+
+class TestSerializeCSVCompact:
+    """Tests for compact (columnar) data loading"""
+
+    def test_compact_data(self, temp_csv_files: dict[str, str], sample_product_data: list[dict[str, str]]) -> None:
+        """Test loading files into a compact table"""
+        serializer = SerializeCSV((temp_csv_files["file1"], temp_csv_files["file2"]), temp_csv_files["data_dir"])
+        result = serializer.get_full_data_from_files(compact=True, numeric_columns=("rating",))
+
+        assert isinstance(result, ColumnarRows)
+        assert len(result) == 6
+        assert result[3]["name"] == sample_product_data[3]["name"]
+        assert result[3]["rating"] == 4.4
+        # Compact tables are returned fresh and don't touch full_data
+        assert serializer.full_data == []
+
+    def test_compact_blank_lines(self, tmp_path) -> None:
+        """Test that blank lines are skipped in compact tables as in dictionaries"""
+        (tmp_path / "blank.csv").write_text("brand,rating\napple,4.5\n\nxiaomi,4.1\n")
+        serializer = SerializeCSV(("blank.csv",), str(tmp_path))
+
+        result = serializer.get_full_data_from_files(compact=True, numeric_columns=("rating",))
+
+        assert len(result) == len(serializer.get_full_data_from_files()) == 2
+        assert result[1] == {"brand": "xiaomi", "rating": 4.1}
+
+    def test_compact_encoded_columns(self, temp_csv_files: dict[str, str]) -> None:
+        """Test dictionary-encoding a column while loading files"""
+        serializer = SerializeCSV((temp_csv_files["file1"], temp_csv_files["file2"]), temp_csv_files["data_dir"])
+        result = serializer.get_full_data_from_files(compact=True, encoded_columns=("brand",))
+
+        assert result.columns["brand"].values == ["apple", "samsung", "xiaomi"]
+        assert list(result.columns["brand"].codes) == [0, 1, 2, 2, 0, 1]
+
+    def test_compact_empty_inputs(self, empty_csv_file: dict[str, str]) -> None:
+        """Test compact loading with no files and with an empty file"""
+        assert len(SerializeCSV(()).get_full_data_from_files(compact=True)) == 0
+
+        serializer = SerializeCSV((empty_csv_file["file"],), empty_csv_file["data_dir"])
+        assert len(serializer.get_full_data_from_files(compact=True)) == 0
+
+    def test_compact_uses_less_memory(self, tmp_path) -> None:
+        """Test that the compact table needs much less memory than dictionaries"""
+        with open(tmp_path / "big.csv", "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["name", "brand", "price", "rating"])
+            for i in range(5000):
+                writer.writerow([f"product {i}", f"brand {i % 10}", str(100 + i % 900), f"{i % 50 / 10:.1f}"])
+
+        def peak(**kwargs: object) -> int:
+            tracemalloc.start()
+            data = SerializeCSV(("big.csv",), str(tmp_path)).get_full_data_from_files(**kwargs)
+            size = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            assert len(data) == 5000
+            return size
+
+        assert peak(compact=True, numeric_columns=("price", "rating")) < peak() / 2
+
+
+class TestParseSize:
+    """Tests for parse_size"""
+
+    @pytest.mark.parametrize(
+        ("value", "expected"),
+        [("1024", 1024), ("4K", 4096), ("512M", 512 * 1024**2), ("1.5G", 3 * 1024**3 // 2), ("2gb", 2 * 1024**3)],
+    )
+    def test_valid_sizes(self, value: str, expected: int) -> None:
+        """Test parsing sizes with and without units"""
+        assert parse_size(value) == expected
+
+    def test_invalid_size(self) -> None:
+        """Test that invalid sizes are rejected"""
+        with pytest.raises(ValueError):
+            parse_size("lots")